@@ -0,0 +1,294 @@
+"""
+Headless batch generation of Fortran solvers.
+
+Examples:
+    python3 ./src/batch_codegen.py --labs 1.1 2.1 --out build/solvers
+    python3 ./src/batch_codegen.py --specs-dir problems/ --workers 8
+    python3 ./src/batch_codegen.py --labs 2.3 --build O3Native --openmp
+"""
+
+import argparse
+import concurrent.futures
+import dataclasses
+import json
+import os
+import sys
+import time
+from typing import Dict, List, Optional, Tuple
+
+from codegen.build import BuildConfig, CompilerProfile, build_solver
+from codegen.template_gen import GENERATED_DIR, gen_template
+from models import problem
+
+SPEC_EXTENSIONS = (".json", ".toml")
+
+
+@dataclasses.dataclass
+class BatchResult:
+    name: str
+    out_dir: str
+    seconds: float
+    error: Optional[str] = None
+    executable: Optional[str] = None
+
+    @property
+    def status(self) -> str:
+        return "OK" if self.error is None else "FAILED"
+
+
+def load_spec(path: str) -> Tuple[problem.ProblemStrs, Optional[problem.GridParams]]:
+    with open(path, "r") as f:
+        if path.endswith(".toml"):
+            import toml
+
+            data = toml.load(f)
+        else:
+            data = json.load(f)
+
+    grid_params = data.pop("grid_params", None)
+    if grid_params is not None:
+        grid_params = problem.GridParams(**grid_params)
+    return problem.ProblemStrs.from_dict(data), grid_params
+
+
+def load_specs_dir(
+    specs_dir: str,
+) -> Dict[str, Tuple[problem.ProblemStrs, Optional[problem.GridParams]]]:
+    return {
+        os.path.splitext(name)[0]: load_spec(os.path.join(specs_dir, name))
+        for name in sorted(os.listdir(specs_dir))
+        if name.endswith(SPEC_EXTENSIONS)
+    }
+
+
+def generate_one(
+    name: str,
+    problem_strs: problem.ProblemStrs,
+    grid_params: problem.GridParams,
+    solver_params: problem.SolverParams,
+    out_dir: str,
+    build_config: Optional[BuildConfig] = None,
+) -> BatchResult:
+    start = time.perf_counter()
+    executable = None
+    try:
+        solver_file = gen_template(
+            problem.ProblemSympy(problem_strs, grid_params),
+            out_dir=out_dir,
+            solver_params=solver_params,
+        )
+        if build_config is not None:
+            executable = build_solver(solver_file, build_config)
+    except Exception as err:
+        return BatchResult(
+            name, out_dir, time.perf_counter() - start, f"{type(err).__name__}: {err}"
+        )
+    return BatchResult(name, out_dir, time.perf_counter() - start, None, executable)
+
+
+def run_batch(
+    problems: Dict[str, Tuple[problem.ProblemStrs, Optional[problem.GridParams]]],
+    default_grid_params: problem.GridParams,
+    solver_params: problem.SolverParams,
+    out_root: str,
+    workers: Optional[int] = None,
+    build_config: Optional[BuildConfig] = None,
+) -> List[BatchResult]:
+    with concurrent.futures.ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = [
+            executor.submit(
+                generate_one,
+                name,
+                problem_strs,
+                grid_params or default_grid_params,
+                solver_params,
+                os.path.join(out_root, name),
+                build_config,
+            )
+            for name, (problem_strs, grid_params) in problems.items()
+        ]
+        return [future.result() for future in futures]
+
+
+def print_summary(results: List[BatchResult], wall_time: float):
+    name_width = max([len("problem")] + [len(result.name) for result in results])
+    print(f"{'problem':<{name_width}}  {'status':<6}  {'time, s':>8}  output")
+    for result in results:
+        print(
+            f"{result.name:<{name_width}}  {result.status:<6}  "
+            f"{result.seconds:>8.2f}  {result.out_dir}"
+        )
+        if result.error:
+            print(f"{'':<{name_width}}  {result.error}")
+        if result.executable:
+            print(f"{'':<{name_width}}  {result.executable}")
+    failed = sum(result.error is not None for result in results)
+    print(
+        f"{len(results) - failed} generated, {failed} failed, "
+        f"wall time {wall_time:.2f} s"
+    )
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument(
+        "--labs",
+        nargs="*",
+        metavar="LAB",
+        help="keys of problem.StrsModelsFromLabs, all of them if given without values",
+    )
+    parser.add_argument(
+        "--specs-dir", help="directory of JSON/TOML files with ProblemStrs fields"
+    )
+    parser.add_argument(
+        "--out", default=os.path.join(GENERATED_DIR, "batch"), help="output root"
+    )
+    parser.add_argument("--x-step", type=float, default=0.01)
+    parser.add_argument("--t-step", type=float, default=0.001)
+    parser.add_argument("--y-step", type=float, default=None)
+    parser.add_argument("--eps", type=float, default=None)
+    parser.add_argument("--alltime", type=float, default=None)
+    parser.add_argument(
+        "--output-format",
+        choices=[output_format.value for output_format in problem.OutputFormat],
+        default=problem.OutputFormat.Tecplot.value,
+    )
+    snapshots = parser.add_mutually_exclusive_group()
+    snapshots.add_argument(
+        "--snapshot-every",
+        type=int,
+        default=0,
+        metavar="STEPS",
+        help="append the field to SNAPSHOTS.BIN every STEPS time steps",
+    )
+    snapshots.add_argument(
+        "--snapshot-interval",
+        type=float,
+        default=0.0,
+        metavar="TIME",
+        help="append the field to SNAPSHOTS.BIN every TIME of simulated time",
+    )
+    parser.add_argument(
+        "--log-level",
+        choices=[log_level.value for log_level in problem.LogLevel],
+        default=problem.LogLevel.Iterations.value,
+    )
+    parser.add_argument(
+        "--output-every",
+        type=int,
+        default=1,
+        metavar="STEPS",
+        help="OUTPUT line every STEPS time steps with --log-level Steps",
+    )
+    parser.add_argument(
+        "--no-errors",
+        action="store_true",
+        help="do not compute the error norms against FAN in OUTPUT",
+    )
+    parser.add_argument(
+        "--linear-solver",
+        choices=[solver.value for solver in problem.LinearSolver],
+        default=problem.LinearSolver.SOR.value,
+        help="inner iteration of 2D solvers",
+    )
+    parser.add_argument(
+        "--omega",
+        type=float,
+        default=0.0,
+        help="relaxation factor of 2D solvers, 0 - estimated while solving",
+    )
+    parser.add_argument(
+        "--theta",
+        type=float,
+        default=1.0,
+        help="weight of the new time level, 1 - implicit, 0.5 - Crank-Nicolson",
+    )
+    parser.add_argument(
+        "--adaptive-dt",
+        action="store_true",
+        help="control the time step by step doubling, accepted steps go to DT.OUT",
+    )
+    parser.add_argument("--dt-tol", type=float, default=1e-4)
+    parser.add_argument(
+        "--dt-min", type=float, default=0.0, help="0 - 1e-3 of --t-step"
+    )
+    parser.add_argument("--dt-max", type=float, default=0.0, help="0 - alltime/10")
+    parser.add_argument(
+        "--steady-tol",
+        type=float,
+        default=0.0,
+        help="stop once max|T - T0|/DT is below it, 0 - run until alltime",
+    )
+    parser.add_argument(
+        "--build",
+        choices=[profile.value for profile in CompilerProfile],
+        default=None,
+        metavar="PROFILE",
+        help="also compile the solvers with this gfortran profile "
+        f"({', '.join(profile.value for profile in CompilerProfile)})",
+    )
+    parser.add_argument(
+        "--openmp",
+        action="store_true",
+        help="OpenMP variant of 2D solvers, compiled with -fopenmp by --build",
+    )
+    parser.add_argument("--workers", type=int, default=None)
+    args = parser.parse_args(argv)
+
+    problems = {}
+    if args.labs is not None:
+        labs = args.labs or list(problem.StrsModelsFromLabs)
+        for lab in labs:
+            if lab not in problem.StrsModelsFromLabs:
+                parser.error(f"unknown lab {lab}")
+            problems[lab] = (problem.StrsModelsFromLabs[lab], None)
+    if args.specs_dir:
+        problems.update(load_specs_dir(args.specs_dir))
+    if not problems:
+        parser.error("nothing to generate, use --labs and/or --specs-dir")
+    build_config = None
+    if args.build is not None:
+        build_config = BuildConfig(CompilerProfile(args.build), args.openmp)
+
+    try:
+        solver_params = problem.SolverParams(
+            output_format=problem.OutputFormat(args.output_format),
+            snapshot_every=args.snapshot_every,
+            snapshot_interval=args.snapshot_interval,
+            log_level=problem.LogLevel(args.log_level),
+            output_every=args.output_every,
+            compute_errors=not args.no_errors,
+            openmp=args.openmp,
+            linear_solver=problem.LinearSolver(args.linear_solver),
+            omega=args.omega,
+            theta=args.theta,
+            adaptive_dt=args.adaptive_dt,
+            dt_tol=args.dt_tol,
+            dt_min=args.dt_min,
+            dt_max=args.dt_max,
+            steady_tol=args.steady_tol,
+        )
+    except ValueError as err:
+        parser.error(str(err))
+
+    start = time.perf_counter()
+    results = run_batch(
+        problems,
+        problem.GridParams(
+            x_step=args.x_step,
+            t_step=args.t_step,
+            y_step=args.y_step,
+            eps=args.eps,
+            alltime=args.alltime,
+        ),
+        solver_params,
+        args.out,
+        args.workers,
+        build_config,
+    )
+    print_summary(results, time.perf_counter() - start)
+    return 0 if all(result.error is None for result in results) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,68 @@
+"""
+Inner iterations and wall time of the 2D linear solvers over grid sizes.
+
+Run from src: python3 -m benchmarks.bench_linear_solvers --x-steps 0.04 0.02 0.01
+"""
+
+import argparse
+import os
+import tempfile
+
+from benchmarks.bench_solver import build_solver, time_solver
+from models import problem
+
+
+def read_iterations(out_dir, column=2):
+    with open(os.path.join(out_dir, "ITER.OUT")) as f:
+        next(f)
+        return [int(line.split()[column]) for line in f]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument(
+        "--lab", default="5.8", choices=list(problem.StrsModelsFromLabs)
+    )
+    parser.add_argument("--x-steps", type=float, nargs="+", default=[0.04, 0.02, 0.01])
+    parser.add_argument("--t-step", type=float, default=0.01)
+    parser.add_argument("--alltime", type=float, default=1.0)
+    parser.add_argument(
+        "--solvers",
+        nargs="+",
+        choices=[solver.value for solver in problem.LinearSolver],
+        default=[solver.value for solver in problem.LinearSolver],
+    )
+    parser.add_argument("--flags", default="-O2", help="gfortran flags")
+    parser.add_argument("--repeat", type=int, default=1)
+    args = parser.parse_args()
+
+    print(f"lab {args.lab}, t_step {args.t_step:g}, alltime {args.alltime:g}")
+    print(
+        f"{'x_step':>8}  {'solver':<10}  {'iter/step':>9}  {'iter total':>10}  "
+        f"{'run, s':>8}"
+    )
+    for x_step in args.x_steps:
+        grid_params = problem.GridParams(
+            x_step=x_step, t_step=args.t_step, alltime=args.alltime
+        )
+        for solver in args.solvers:
+            solver_params = problem.SolverParams(
+                log_level=problem.LogLevel.Final,
+                linear_solver=problem.LinearSolver(solver),
+            )
+            with tempfile.TemporaryDirectory() as out_dir:
+                build_solver(
+                    args.lab, grid_params, solver_params, out_dir, args.flags.split()
+                )
+                seconds = time_solver(out_dir, args.repeat)
+                # PCG: conjugate gradient steps, each costs about one SOR sweep
+                iterations = read_iterations(out_dir, 3 if solver == "PCG" else 2)
+            print(
+                f"{x_step:>8g}  {solver:<10}  "
+                f"{sum(iterations) / len(iterations):>9.1f}  {sum(iterations):>10}  "
+                f"{seconds:>8.3f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+"""
+OpenMP scaling of a generated 2D solver over thread counts.
+
+Run from src: python3 -m benchmarks.bench_scaling --x-step 0.01 --threads 1 2 4 8
+"""
+
+import argparse
+import os
+import tempfile
+
+from benchmarks.bench_solver import build_solver, time_solver
+from codegen.build import BuildConfig, CompilerProfile
+from models import problem
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument(
+        "--lab", default="5.8", choices=list(problem.StrsModelsFromLabs)
+    )
+    parser.add_argument("--x-step", type=float, default=0.02)
+    parser.add_argument("--t-step", type=float, default=0.01)
+    parser.add_argument("--alltime", type=float, default=None)
+    parser.add_argument(
+        "--profile",
+        choices=[profile.value for profile in CompilerProfile],
+        default=CompilerProfile.O2.value,
+    )
+    parser.add_argument(
+        "--threads",
+        type=int,
+        nargs="+",
+        default=[1, 2, 4, 8, 16, 32],
+        help="OMP_NUM_THREADS values",
+    )
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    grid_params = problem.GridParams(
+        x_step=args.x_step, t_step=args.t_step, alltime=args.alltime
+    )
+    solver_params = problem.SolverParams(log_level=problem.LogLevel.Final, openmp=True)
+    flags = BuildConfig(CompilerProfile(args.profile), openmp=True).flags
+    print(
+        f"lab {args.lab}, x_step {args.x_step:g}, t_step {args.t_step:g}, "
+        f"flags {' '.join(flags)!r}, {os.cpu_count()} cores"
+    )
+    print(f"{'threads':>7}  {'run, s':>8}  {'speedup':>7}  {'efficiency':>10}")
+    with tempfile.TemporaryDirectory() as out_dir:
+        build_solver(args.lab, grid_params, solver_params, out_dir, flags)
+        base_seconds = None
+        for threads in args.threads:
+            env = dict(os.environ, OMP_NUM_THREADS=str(threads))
+            seconds = time_solver(out_dir, args.repeat, env)
+            base_seconds = base_seconds or seconds * args.threads[0]
+            speedup = base_seconds / seconds
+            print(
+                f"{threads:>7}  {seconds:>8.3f}  {speedup:>7.2f}  "
+                f"{speedup / threads:>10.0%}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+"""
+Times a generated Fortran solver: codegen, compilation and the run itself.
+
+Run from src: python3 -m benchmarks.bench_solver --lab 2.3 --x-step 1e-5
+"""
+
+import argparse
+import os
+import subprocess
+import tempfile
+import time
+
+from codegen.build import BuildConfig, CompilerProfile
+from codegen.cache import ProblemCodeGenCache
+from codegen.template_gen import gen_template
+from models import problem
+
+
+def build_solver(lab, grid_params, solver_params, out_dir, flags):
+    start = time.perf_counter()
+    solver_file = gen_template(
+        problem.ProblemSympy(problem.StrsModelsFromLabs[lab], grid_params),
+        cache=ProblemCodeGenCache(cache_dir=None),
+        out_dir=out_dir,
+        solver_params=solver_params,
+    )
+    codegen_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    subprocess.run(
+        ["gfortran", *flags, os.path.basename(solver_file)], cwd=out_dir, check=True
+    )
+    return codegen_seconds, time.perf_counter() - start
+
+
+def time_solver(out_dir, repeat, env=None):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        subprocess.run(
+            ["./a.out"], cwd=out_dir, check=True, stdout=subprocess.DEVNULL, env=env
+        )
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument(
+        "--lab", default="2.3", choices=list(problem.StrsModelsFromLabs)
+    )
+    parser.add_argument("--x-step", type=float, default=1e-4)
+    parser.add_argument("--t-step", type=float, default=0.01)
+    parser.add_argument(
+        "--profile",
+        choices=[profile.value for profile in CompilerProfile],
+        default=CompilerProfile.O2.value,
+    )
+    parser.add_argument("--openmp", action="store_true")
+    parser.add_argument("--flags", default=None, help="gfortran flags, over --profile")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+    if args.flags is None:
+        args.flags = " ".join(
+            BuildConfig(CompilerProfile(args.profile), args.openmp).flags
+        )
+
+    grid_params = problem.GridParams(x_step=args.x_step, t_step=args.t_step)
+    # diagnostics output would dominate the timing
+    solver_params = problem.SolverParams(log_level=problem.LogLevel.Final)
+    with tempfile.TemporaryDirectory() as out_dir:
+        codegen_seconds, compile_seconds = build_solver(
+            args.lab, grid_params, solver_params, out_dir, args.flags.split()
+        )
+        run_seconds = time_solver(out_dir, args.repeat)
+    print(
+        f"lab {args.lab}, x_step {args.x_step:g}, t_step {args.t_step:g}, "
+        f"flags {args.flags!r}"
+    )
+    print(f"codegen: {codegen_seconds:8.3f} s")
+    print(f"compile: {compile_seconds:8.3f} s")
+    print(f"    run: {run_seconds:8.3f} s (best of {args.repeat})")
+
+
+if __name__ == "__main__":
+    main()
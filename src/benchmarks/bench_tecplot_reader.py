@@ -0,0 +1,55 @@
+"""
+Compares python and numpy engines of read_tecplot on a synthetic ALL.DAT.
+
+Run from src: python3 -m benchmarks.bench_tecplot_reader --rows 1000000
+"""
+
+import argparse
+import os
+import tempfile
+import time
+
+import numpy as np
+
+from tecplot_reader import read_tecplot
+
+VARIABLES = ["X", "T", "Ta", "delT", "delT1"]
+
+
+def write_all_dat(path, rows, zones):
+    rng = np.random.default_rng(0)
+    with open(path, "w") as f:
+        f.write(" VARIABLES=" + ",".join(f'"{var}"' for var in VARIABLES) + "\n")
+        for zone in range(zones):
+            f.write(f' ZONE T="step {zone}", I={rows}, F=POINT\n')
+            np.savetxt(f, rng.random((rows, len(VARIABLES))), fmt="%15.6E")
+
+
+def time_engine(path, engine, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        read_tecplot(path, verbose=False, engine=engine)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", type=int, default=200000)
+    parser.add_argument("--zones", type=int, default=1)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = os.path.join(tmp_dir, "ALL.DAT")
+        write_all_dat(path, args.rows, args.zones)
+        size_mb = os.path.getsize(path) / 2**20
+        print(f"{args.zones} zone(s) x {args.rows} rows, {size_mb:.1f} MB")
+        for engine in ["python", "numpy"]:
+            seconds = time_engine(path, engine, args.repeat)
+            print(f"{engine:>6}: {seconds:8.3f} s  {size_mb / seconds:8.1f} MB/s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,142 @@
+"""
+Readers of the unformatted stream output of the generated solvers.
+
+ALL.BIN layout, native byte order:
+    CHARACTER(8)  'PGCFDBIN'
+    INTEGER(4)    version, NDIMS, dims(NDIMS), NVARS
+    REAL(8)       TIME
+    CHARACTER(16) names(NVARS)
+    REAL(8)       values of each variable in turn, Fortran (column-major) order
+
+SNAPSHOTS.BIN layout, appended to while the solver runs:
+    CHARACTER(8)  'PGCFDSNP'
+    INTEGER(4)    version, NDIMS, dims(NDIMS), NCOORDS, NFIELDS
+    CHARACTER(16) names(NCOORDS + NFIELDS)
+    REAL(8)       coordinates, dims(k) values of each axis in turn
+    frames of
+    REAL(8)       TIME, values of each field in turn, Fortran order
+"""
+
+import dataclasses
+import os
+from typing import Dict, Iterator, List, Tuple
+
+import numpy as np
+import pandas as pd
+
+MAGIC = b"PGCFDBIN"
+SNAPSHOTS_MAGIC = b"PGCFDSNP"
+NAME_LENGTH = 16
+
+
+@dataclasses.dataclass
+class BinaryOutput:
+    time: float
+    dims: Tuple[int, ...]
+    # zero-copy views into the file, indexed like the Fortran arrays (I, J)
+    variables: Dict[str, np.ndarray]
+
+    def __getitem__(self, name: str) -> np.ndarray:
+        return self.variables[name]
+
+    def to_frame(self) -> pd.DataFrame:
+        return pd.DataFrame(
+            {name: values.ravel(order="F") for name, values in self.variables.items()}
+        )
+
+
+def read_header(filename: str) -> Tuple[int, Tuple[int, ...], float, List[str]]:
+    with open(filename, "rb") as f:
+        if f.read(len(MAGIC)) != MAGIC:
+            raise ValueError(f"{filename} is not a binary solver output")
+        version, ndims = np.fromfile(f, dtype=np.int32, count=2)
+        if version != 1:
+            raise ValueError(f"Unsupported binary output version {version}")
+        dims = tuple(int(dim) for dim in np.fromfile(f, dtype=np.int32, count=ndims))
+        nvars = int(np.fromfile(f, dtype=np.int32, count=1)[0])
+        time = float(np.fromfile(f, dtype=np.float64, count=1)[0])
+        names = [f.read(NAME_LENGTH).decode("ascii").strip() for _ in range(nvars)]
+        return f.tell(), dims, time, names
+
+
+def read_binary_output(filename: str) -> BinaryOutput:
+    offset, dims, time, names = read_header(filename)
+    # variable index is the slowest, I the fastest: reversed dims in C order
+    data = np.memmap(
+        filename,
+        dtype=np.float64,
+        mode="r",
+        offset=offset,
+        shape=(len(names),) + dims[::-1],
+    )
+    return BinaryOutput(time, dims, {name: data[k].T for k, name in enumerate(names)})
+
+
+@dataclasses.dataclass
+class SnapshotSeries:
+    dims: Tuple[int, ...]
+    coordinates: Dict[str, np.ndarray]
+    field_names: List[str]
+    # one row per complete frame: TIME, then the fields; a memmap, so frames
+    # are paged in only when accessed
+    frames: np.ndarray
+
+    def __len__(self) -> int:
+        return len(self.frames)
+
+    def __getitem__(self, frame: int) -> Tuple:
+        """(time, *coordinates, *fields), i.e. (time, X, T, Ta) in 1D."""
+        row = self.frames[frame]
+        fields = row[1:].reshape((len(self.field_names),) + self.dims[::-1])
+        return (
+            float(row[0]),
+            *self.coordinates.values(),
+            *[fields[k].T for k in range(len(self.field_names))],
+        )
+
+    def __iter__(self) -> Iterator[Tuple]:
+        for frame in range(len(self)):
+            yield self[frame]
+
+    @property
+    def times(self) -> np.ndarray:
+        return self.frames[:, 0]
+
+
+def read_snapshots(filename: str) -> SnapshotSeries:
+    with open(filename, "rb") as f:
+        if f.read(len(SNAPSHOTS_MAGIC)) != SNAPSHOTS_MAGIC:
+            raise ValueError(f"{filename} is not a solver snapshots file")
+        version, ndims = np.fromfile(f, dtype=np.int32, count=2)
+        if version != 1:
+            raise ValueError(f"Unsupported snapshots version {version}")
+        dims = tuple(int(dim) for dim in np.fromfile(f, dtype=np.int32, count=ndims))
+        ncoords, nfields = (int(n) for n in np.fromfile(f, dtype=np.int32, count=2))
+        names = [
+            f.read(NAME_LENGTH).decode("ascii").strip()
+            for _ in range(ncoords + nfields)
+        ]
+        coordinates = {
+            name: np.fromfile(f, dtype=np.float64, count=dims[k])
+            for k, name in enumerate(names[:ncoords])
+        }
+        offset = f.tell()
+
+    frame_size = 1 + nfields * int(np.prod(dims))
+    # the solver may be still running: a partly written last frame is skipped
+    nframes = (os.path.getsize(filename) - offset) // (8 * frame_size)
+    if nframes:
+        frames = np.memmap(
+            filename,
+            dtype=np.float64,
+            mode="r",
+            offset=offset,
+            shape=(nframes, frame_size),
+        )
+    else:
+        frames = np.empty((0, frame_size))
+    return SnapshotSeries(dims, coordinates, names[ncoords:], frames)
+
+
+def iter_snapshots(filename: str) -> Iterator[Tuple]:
+    return iter(read_snapshots(filename))
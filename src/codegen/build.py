@@ -0,0 +1,170 @@
+import dataclasses
+import enum
+import functools
+import hashlib
+import logging
+import os
+import subprocess
+import tempfile
+import time
+from typing import *
+
+from codegen.cache import DEFAULT_CACHE_DIR
+
+logger = logging.getLogger(__name__)
+
+COMPILER = "gfortran"
+# leftovers of failed or interrupted builds older than this are removed
+STALE_TMP_SECONDS = 3600
+
+
+@enum.unique
+class CompilerProfile(enum.Enum):
+    Debug = "Debug"
+    O2 = "O2"
+    O3Native = "O3Native"
+
+
+PROFILE_FLAGS = {
+    CompilerProfile.Debug: ["-O0", "-g", "-fcheck=all", "-fbacktrace"],
+    CompilerProfile.O2: ["-O2"],
+    CompilerProfile.O3Native: ["-O3", "-march=native", "-funroll-loops"],
+}
+
+
+@dataclasses.dataclass
+class BuildConfig:
+    profile: CompilerProfile = CompilerProfile.O2
+    openmp: bool = False
+
+    @property
+    def flags(self) -> List[str]:
+        return PROFILE_FLAGS[self.profile] + (["-fopenmp"] if self.openmp else [])
+
+
+@functools.lru_cache(maxsize=None)
+def compiler_version(compiler: str = COMPILER) -> str:
+    try:
+        return subprocess.run(
+            [compiler, "--version"], capture_output=True, text=True
+        ).stdout
+    except OSError:
+        return ""
+
+
+class SolverBuildCache:
+    """Compiled solvers keyed on the hash of source, flags and compiler.
+
+    An unchanged solver is run again without recompilation, the least
+    recently used executables are removed above max_entries.
+    """
+
+    def __init__(
+        self,
+        cache_dir: str = os.path.join(DEFAULT_CACHE_DIR, "bin"),
+        compiler: str = COMPILER,
+        max_entries: int = 32,
+    ):
+        self.cache_dir = cache_dir
+        self.compiler = compiler
+        self.max_entries = max_entries
+
+    def key(self, source_file: str, flags: List[str]) -> str:
+        sha = hashlib.sha256()
+        sha.update(compiler_version(self.compiler).encode("utf-8"))
+        sha.update(" ".join([self.compiler, *flags]).encode("utf-8"))
+        with open(source_file, "rb") as f:
+            sha.update(f.read())
+        return sha.hexdigest()
+
+    def executable_path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, f"{key}.out")
+
+    def lookup(self, source_file: str, flags: List[str]) -> Optional[str]:
+        path = self.executable_path(self.key(source_file, flags))
+        if not os.path.exists(path):
+            return None
+        # mtime is the recency mark used by _evict
+        os.utime(path)
+        return path
+
+    def compile_command(
+        self, source_file: str, flags: List[str], output: str
+    ) -> List[str]:
+        return [self.compiler, *flags, source_file, "-o", output]
+
+    def reserve(self, source_file: str, flags: List[str]) -> Tuple[str, str]:
+        """Final and temporary executable paths of a build to commit later."""
+        os.makedirs(self.cache_dir, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix=".tmp")
+        os.close(fd)
+        return self.executable_path(self.key(source_file, flags)), tmp_path
+
+    def commit(self, tmp_path: str, path: str):
+        os.replace(tmp_path, path)
+        self._evict()
+
+    def build(self, source_file: str, config: Optional[BuildConfig] = None) -> str:
+        flags = (config or BuildConfig()).flags
+        path = self.lookup(source_file, flags)
+        if path is not None:
+            return path
+        path, tmp_path = self.reserve(source_file, flags)
+        try:
+            # .mod files of the solver modules go to a scratch directory
+            with tempfile.TemporaryDirectory() as mod_dir:
+                result = subprocess.run(
+                    self.compile_command(
+                        source_file, flags + ["-J", mod_dir], tmp_path
+                    ),
+                    capture_output=True,
+                    text=True,
+                )
+            if result.returncode != 0:
+                raise RuntimeError(f"Compilation failed:\n{result.stderr}")
+            self.commit(tmp_path, path)
+        finally:
+            # also when the compiler is missing and subprocess.run raises
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+        return path
+
+    def clear(self):
+        for path in self._entries():
+            os.remove(path)
+
+    def _entries(self) -> List[str]:
+        if not os.path.isdir(self.cache_dir):
+            return []
+        return [
+            os.path.join(self.cache_dir, name)
+            for name in os.listdir(self.cache_dir)
+            if name.endswith(".out")
+        ]
+
+    def _evict(self):
+        entries = sorted(self._entries(), key=os.path.getmtime)
+        stale = entries[: max(len(entries) - self.max_entries, 0)]
+        stale += [
+            os.path.join(self.cache_dir, name)
+            for name in os.listdir(self.cache_dir)
+            if name.endswith(".tmp")
+            and time.time() - os.path.getmtime(os.path.join(self.cache_dir, name))
+            > STALE_TMP_SECONDS
+        ]
+        for path in stale:
+            try:
+                os.remove(path)
+            except OSError as err:
+                logger.warning(f"Cannot remove cached solver {path}: {err}")
+
+
+default_build_cache = SolverBuildCache()
+
+
+def build_solver(
+    source_file: str,
+    config: Optional[BuildConfig] = None,
+    cache: SolverBuildCache = default_build_cache,
+) -> str:
+    return cache.build(source_file, config)
@@ -0,0 +1,189 @@
+import collections
+import dataclasses
+import hashlib
+import logging
+import os
+import pickle
+import tempfile
+from typing import *
+
+import sympy
+
+from models import codegen_problem, problem
+
+logger = logging.getLogger(__name__)
+
+TEMPLATES_DIR = os.path.join(os.path.dirname(__file__), os.pardir, "templates")
+
+
+def _sources_hash() -> str:
+    # any change of the codegen sources or templates invalidates the disk tier
+    digest = hashlib.sha256()
+    sources = [codegen_problem.__file__, problem.__file__] + [
+        os.path.join(TEMPLATES_DIR, name) for name in sorted(os.listdir(TEMPLATES_DIR))
+    ]
+    for path in sources:
+        with open(path, "rb") as f:
+            digest.update(f.read())
+    return digest.hexdigest()
+
+
+CACHE_VERSION = _sources_hash()
+
+DEFAULT_CACHE_DIR = os.environ.get(
+    "PYGENCFD_CACHE_DIR", os.path.join(os.path.expanduser("~"), ".cache", "PyGenCFD")
+)
+
+
+def problem_hash(sympy_problem: problem.ProblemSympy) -> str:
+    parts = [
+        f"version={CACHE_VERSION}",
+        sympy.srepr(sympy_problem.equation),
+        *[sympy.srepr(cond) for cond in sympy_problem.L_boundary_conditions],
+        "|",
+        *[sympy.srepr(cond) for cond in sympy_problem.R_boundary_conditions],
+        sympy.srepr(getattr(sympy_problem, "initial_condition", None)),
+        sympy.srepr(getattr(sympy_problem, "analytical_solution", None)),
+        sympy_problem.coordinate_system.value,
+        repr(dataclasses.astuple(sympy_problem.grid_params)),
+    ]
+    return hashlib.sha256("\n".join(parts).encode("utf-8")).hexdigest()
+
+
+class ProblemCodeGenCache:
+    """Two-tier (memory LRU + disk) cache of ProblemCodeGen results.
+
+    Entries are keyed on problem_hash, so equal problems typed again or
+    loaded after an app restart skip the sympy processing entirely.
+    """
+
+    def __init__(
+        self,
+        cache_dir: Optional[str] = os.path.join(DEFAULT_CACHE_DIR, "codegen"),
+        memory_size: int = 32,
+        disk_size_limit: int = 64 * 1024 * 1024,
+    ):
+        self.cache_dir = cache_dir
+        self.memory_size = memory_size
+        self.disk_size_limit = disk_size_limit
+        self._memory: "collections.OrderedDict[str, codegen_problem.ProblemCodeGen]"
+        self._memory = collections.OrderedDict()
+
+    def get(
+        self, sympy_problem: problem.ProblemSympy
+    ) -> codegen_problem.ProblemCodeGen:
+        key = problem_hash(sympy_problem)
+
+        problem_codegen = self._memory_get(key)
+        if problem_codegen is not None:
+            return problem_codegen
+
+        problem_codegen = self._disk_get(key)
+        if problem_codegen is None:
+            problem_codegen = codegen_problem.ProblemCodeGen(sympy_problem)
+            self._disk_put(key, problem_codegen)
+
+        self._memory_put(key, problem_codegen)
+        return problem_codegen
+
+    def clear(self):
+        self._memory.clear()
+        for path in self._disk_entries():
+            self._remove(path)
+
+    # region memory tier
+    def _memory_get(self, key: str) -> Optional[codegen_problem.ProblemCodeGen]:
+        if key not in self._memory:
+            return None
+        self._memory.move_to_end(key)
+        return self._memory[key]
+
+    def _memory_put(self, key: str, problem_codegen: codegen_problem.ProblemCodeGen):
+        self._memory[key] = problem_codegen
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_size:
+            self._memory.popitem(last=False)
+
+    # endregion memory tier
+
+    # region disk tier
+    def _disk_path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, f"{key}.pickle")
+
+    def _disk_entries(self) -> List[str]:
+        if not self.cache_dir or not os.path.isdir(self.cache_dir):
+            return []
+        return [
+            os.path.join(self.cache_dir, name)
+            for name in os.listdir(self.cache_dir)
+            if name.endswith(".pickle")
+        ]
+
+    def _disk_get(self, key: str) -> Optional[codegen_problem.ProblemCodeGen]:
+        if not self.cache_dir:
+            return None
+        path = self._disk_path(key)
+        try:
+            with open(path, "rb") as f:
+                problem_codegen = pickle.load(f)
+        except FileNotFoundError:
+            return None
+        except Exception as err:
+            logger.warning(f"Dropping broken codegen cache entry {path}: {err}")
+            self._remove(path)
+            return None
+        # mtime is the recency mark used by _evict; batch workers share the
+        # directory, so the entry may be evicted by another process meanwhile
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        return problem_codegen
+
+    def _disk_put(self, key: str, problem_codegen: codegen_problem.ProblemCodeGen):
+        if not self.cache_dir:
+            return
+        tmp_path = None
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix=".tmp")
+            with os.fdopen(fd, "wb") as f:
+                pickle.dump(problem_codegen, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, self._disk_path(key))
+        except (OSError, pickle.PicklingError, AttributeError, TypeError) as err:
+            logger.warning(f"Cannot write codegen cache entry: {err}")
+            return
+        finally:
+            if tmp_path is not None and os.path.exists(tmp_path):
+                os.remove(tmp_path)
+        self._evict()
+
+    def _remove(self, path: str):
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+        except OSError as err:
+            logger.warning(f"Cannot remove codegen cache entry {path}: {err}")
+
+    def _evict(self):
+        entries = []
+        for path in self._disk_entries():
+            try:
+                entries.append((os.stat(path), path))
+            except OSError:
+                # removed by another process after listing
+                continue
+        total_size = sum(stat.st_size for stat, _ in entries)
+        # the most recent entry is kept even if it alone exceeds the limit
+        oldest_first = sorted(entries, key=lambda entry: entry[0].st_mtime)[:-1]
+        for stat, path in oldest_first:
+            if total_size <= self.disk_size_limit:
+                break
+            self._remove(path)
+            total_size -= stat.st_size
+
+    # endregion disk tier
+
+
+default_cache = ProblemCodeGenCache()
@@ -0,0 +1,358 @@
+"""
+In-process NumPy backend of the 1D solver.
+
+The sympy expressions ProblemCodeGen generates GAMSOR, BOUND_INIT and START
+from are lambdified into NumPy functions and marched in time like COND1 of
+templates/1dimension.jinja2, so a problem runs without gfortran and the
+result comes back as arrays. Symbols left free in the problem are parameters:
+each is a number or a 1D array, arrays are solved together as a batch of
+independent systems by the vectorized tdma.
+"""
+
+import logging
+import math
+from typing import Dict, Optional
+
+import numpy as np
+import sympy
+
+from binary_reader import BinaryOutput
+from codegen.cache import ProblemCodeGenCache, default_cache
+from models import codegen_problem, problem
+
+logger = logging.getLogger(__name__)
+
+# arguments of every lambdified expression, in this order, then parameters;
+# the lower case i of calc_in_point and the I of _use_metrics are both I
+SCALARS = ["i", "I", "L1", "L2", "TIME", "DT", "THETA"]
+ARRAYS = ["X", "XU", "DXU", "T", "T0"]
+# cap of the RMAX iterations of a nonlinear time step
+MAX_ITERATIONS = 500
+
+
+def tdma(aim, ap, aip, b) -> np.ndarray:
+    """Solves AP*T(I) = AIM*T(I-1) + AIP*T(I+1) + B along the last axis.
+
+    Leading axes number independent systems, all swept at once. AIM of the
+    first and AIP of the last equation link values outside the system and
+    are ignored, their terms belong in B.
+    """
+    aim, ap, aip, b = np.broadcast_arrays(aim, ap, aip, b)
+    pt, qt = np.empty(ap.shape), np.empty(ap.shape)
+    pt[..., 0] = aip[..., 0] / ap[..., 0]
+    qt[..., 0] = b[..., 0] / ap[..., 0]
+    for i in range(1, ap.shape[-1]):
+        denom = ap[..., i] - aim[..., i] * pt[..., i - 1]
+        pt[..., i] = aip[..., i] / denom
+        qt[..., i] = (b[..., i] + aim[..., i] * qt[..., i - 1]) / denom
+    t = qt
+    for i in range(ap.shape[-1] - 2, -1, -1):
+        t[..., i] += pt[..., i] * t[..., i + 1]
+    return t
+
+
+def grid_faces(
+    xl: float, xlr: float, cells: int, grid: Optional[problem.StretchedGrid]
+) -> np.ndarray:
+    """XU(2:L1) of GRID in the templates."""
+    if grid is not None and grid.kind == problem.GridKind.Nodes:
+        faces = np.array(grid.nodes, dtype=float)
+        if abs(faces[0] - xl) + abs(faces[-1] - xlr) > 1e-9 * (xlr - xl):
+            raise ValueError("Grid nodes must start at XL and end at XLR")
+        return faces
+    s = np.linspace(0.0, 1.0, cells + 1)
+    if grid is not None and grid.kind == problem.GridKind.Geometric:
+        k = np.arange(cells)
+        k = {
+            problem.Cluster.Left: k,
+            problem.Cluster.Right: cells - 1 - k,
+            problem.Cluster.Both: np.minimum(k, cells - 1 - k),
+        }[grid.cluster]
+        s = np.concatenate([[0.0], np.cumsum(grid.stretch ** k)])
+        s /= s[-1]
+    elif grid is not None and grid.kind == problem.GridKind.Tanh:
+        beta = grid.stretch
+        s = {
+            problem.Cluster.Left: 1 + np.tanh(beta * (s - 1)) / np.tanh(beta),
+            problem.Cluster.Right: np.tanh(beta * s) / np.tanh(beta),
+            problem.Cluster.Both: 0.5
+            * (1 + np.tanh(beta * (2 * s - 1)) / np.tanh(beta)),
+        }[grid.cluster]
+    return xl + (xlr - xl) * s
+
+
+class _LastAxis:
+    """T[I] of the lambdified code indexes nodes, batch axes come along.
+
+    A constant index like T[2] of a boundary condition keeps its node axis
+    to broadcast against parameters the same way.
+    """
+
+    def __init__(self, array: np.ndarray):
+        self.array = array
+
+    def __getitem__(self, index):
+        return self.array[..., np.atleast_1d(index)]
+
+
+class NumpySolver:
+    """COND1 with the coefficients of ProblemCodeGen lambdified.
+
+    Arrays are indexed from 1 like in Fortran, element 0 is unused.
+    """
+
+    def __init__(
+        self,
+        problem_codegen: codegen_problem.ProblemCodeGen,
+        solver_params: Optional[problem.SolverParams] = None,
+        params: Optional[Dict[str, np.ndarray]] = None,
+    ):
+        coords = problem_codegen.coordinate_system
+        if coords.dimensions_count() != 1:
+            raise ValueError("NumPy backend solves 1D problems only")
+        solver_params = solver_params or problem.SolverParams()
+        if solver_params.adaptive_dt:
+            logger.warning("NumPy backend marches with the fixed step T_STEP")
+        self.steady = coords.is_stationary()
+        self.theta = 1.0 if self.steady else solver_params.theta
+        self.steady_tol = 0.0 if self.steady else solver_params.steady_tol
+        self.is_linear = problem_codegen.is_linear
+        self.lag_sp = problem_codegen.lag_sp
+        self.lagged = False
+        self.L_cond = problem_codegen.L_boundary_conditions[0]
+        self.R_cond = problem_codegen.R_boundary_conditions[0]
+
+        grid_params = problem_codegen.grid_params
+        self.dt = grid_params.t_step
+        self.eps = grid_params.eps or 1e-4
+        self.alltime = grid_params.alltime or 10
+        self._set_grid(grid_params)
+
+        exprs = {
+            **problem_codegen.coefficient_exprs,
+            "FAN": codegen_problem.calc_in_point(
+                sympy.sympify(problem_codegen.analytical_expr), coords
+            ),
+        }
+        for side, cond in [("L", self.L_cond), ("R", self.R_cond)]:
+            exprs.update({f"{side}_{name}": e for name, e in cond.exprs.items()})
+        if not self.steady:
+            exprs["T_INIT"] = problem_codegen.initial_condition.exprs["T"]
+            self.time = float(problem_codegen.initial_condition._axis_point)
+        else:
+            self.time = 0.0
+        self._set_params(exprs, params or {})
+        args = [
+            *sympy.symbols(SCALARS),
+            *[sympy.IndexedBase(name) for name in ARRAYS],
+            *sympy.symbols(self.param_names),
+        ]
+        self.funcs = {
+            name: sympy.lambdify(args, expr, "numpy") for name, expr in exprs.items()
+        }
+
+    def _set_grid(self, grid_params: problem.GridParams):
+        xl = float(self.L_cond._axis_point)
+        xlr = float(self.R_cond._axis_point)
+        grid = grid_params.x_grid
+        if grid is not None and grid.kind == problem.GridKind.Nodes:
+            self.L1 = len(grid.nodes) + 1
+        else:
+            self.L1 = math.ceil((xlr - xl) / grid_params.x_step - 1e-9)
+        L1 = self.L1
+        self.XU = np.zeros(L1 + 1)
+        self.XU[2:] = grid_faces(xl, xlr, L1 - 2, grid)
+        self.X = np.zeros(L1 + 1)
+        self.X[1], self.X[L1] = self.XU[2], self.XU[L1]
+        self.X[2:L1] = 0.5 * (self.XU[2:L1] + self.XU[3:])
+        # METRICS
+        self.DXU = np.zeros(L1 + 1)
+        self.DXU[2:L1] = self.XU[3:] - self.XU[2:L1]
+        self.RDX = np.zeros(L1 + 1)
+        self.RDX[2:] = 1 / (self.X[2:] - self.X[1:L1])
+
+    def _set_params(self, exprs: Dict[str, sympy.Expr], params: Dict[str, object]):
+        known = set(SCALARS) | set(ARRAYS)
+        names = {
+            str(symbol)
+            for expr in exprs.values()
+            for symbol in sympy.sympify(expr).free_symbols
+            if isinstance(symbol, sympy.Symbol) and str(symbol) not in known
+        }
+        missing, unknown = names - set(params), set(params) - names
+        if missing or unknown:
+            raise ValueError(
+                f"Problem parameters are {sorted(names)}, got {sorted(params)}"
+            )
+        self.param_names = sorted(names)
+        values = [np.asarray(params[name], dtype=float) for name in self.param_names]
+        if any(value.ndim > 1 for value in values):
+            raise ValueError("Parameters must be numbers or 1D arrays")
+        # the node axis goes last
+        self.batch = np.broadcast(*values).shape if values else ()
+        self.params = [value[..., np.newaxis] for value in values]
+
+    def _eval(self, name: str, index) -> np.ndarray:
+        # parameters carry a node axis, so a single node is evaluated as [node]
+        nodes = np.atleast_1d(index)
+        value = self.funcs[name](
+            nodes,
+            nodes,
+            self.L1,
+            self.L1 - 1,
+            self.time,
+            self.dt,
+            self.theta,
+            *[
+                _LastAxis(array)
+                for array in [self.X, self.XU, self.DXU, self.T, self.T0]
+            ],
+            *self.params,
+        )
+        value = np.broadcast_to(value, self.batch + nodes.shape)
+        return value.reshape(self.batch + np.shape(index)).astype(float)
+
+    def bound_init(self, active=True):
+        """Boundary values of T, batch members where active is False keep theirs."""
+        for cond, node in [(self.L_cond, 1), (self.R_cond, self.L1)]:
+            value = self._eval(f"{cond.bound_side.value}_T", node)
+            self.T[..., node] = np.where(active, value, self.T[..., node])
+
+    def gamsor(self):
+        """GAMI at faces, CON, APS and RHO at nodes 2..L2 with the boundary terms."""
+        L1, first = self.L1, codegen_problem.ConditionKind.First.name
+        L_first, R_first = self.L_cond.kind == first, self.R_cond.kind == first
+        faces = np.arange(2 if L_first else 3, L1 + 1 if R_first else L1)
+        self.GAMI = np.zeros(self.batch + (L1 + 1,))
+        self.GAMI[..., faces] = self._eval("GAMI", faces)
+        nodes = np.arange(2, L1)
+        self.CON, self.APS, self.RHO = [
+            self._eval(name, nodes) for name in ["CON", "APS", "RHO"]
+        ]
+        for cond, node, is_first in [
+            (self.L_cond, 0, L_first),
+            (self.R_cond, -1, R_first),
+        ]:
+            if is_first:
+                continue
+            side = cond.bound_side.value
+            con = self._eval(f"{side}_CON", nodes[node])
+            if self.theta != 1:
+                old = self._eval(f"{side}_CON_OLD", nodes[node])
+                con = self.theta * con + (1 - self.theta) * old
+            self.CON[..., node] += con
+            self.APS[..., node] += self._eval(f"{side}_APS", nodes[node])
+
+    def dif(self):
+        L1, theta = self.L1, self.theta
+        self.gamsor()
+        nodes = np.arange(2, L1)
+        aim = self.GAMI[..., nodes] * self.RDX[nodes]
+        aip = self.GAMI[..., nodes + 1] * self.RDX[nodes + 1]
+        T0 = self.T0[..., nodes]
+        if self.steady:
+            b = self.CON
+            ap = -self.APS + aim + aip
+        else:
+            ap0 = self.RHO * self.DXU[nodes] / self.dt
+            b = self.CON + ap0 * T0
+            if theta != 1:
+                # the operator on T0 with weight 1 - THETA goes to B
+                b = b + (1 - theta) * (
+                    aim * self.T0[..., nodes - 1]
+                    + aip * self.T0[..., nodes + 1]
+                    - (aim + aip - self.APS) * T0
+                )
+                aim, aip = theta * aim, theta * aip
+            ap = -theta * self.APS + ap0 + aim + aip
+            if self.lag_sp:
+                # a positive Sp outweighing AP0 is lagged like in DIF
+                lagged = theta * self.APS >= ap0
+                b = b + np.where(lagged, theta * self.APS * self.T[..., nodes], 0)
+                ap = ap + np.where(lagged, theta * self.APS, 0)
+                self.lagged = np.any(lagged)
+        # boundary values of T close the system
+        b = b.copy()
+        b[..., 0] += aim[..., 0] * self.T[..., 1]
+        b[..., -1] += aip[..., -1] * self.T[..., L1]
+        self.AIM, self.AP, self.AIP, self.B = aim, ap, aip, b
+
+    def solve(self, active=True):
+        self.dif()
+        T = tdma(self.AIM, self.AP, self.AIP, self.B)
+        inner = self.T[..., 2 : self.L1]
+        self.T[..., 2 : self.L1] = np.where(np.expand_dims(active, -1), T, inner)
+
+    def advance(self):
+        if not self.steady:
+            self.time += self.dt
+        if self.is_linear:
+            self.bound_init()
+            self.solve()
+            self.bound_init()
+            if not self.lagged:
+                return
+        # every system of the batch iterates until its own RMAX < eps
+        active = np.ones(self.batch, dtype=bool)
+        for _ in range(MAX_ITERATIONS):
+            self.bound_init(active)
+            T1 = self.T.copy()
+            self.solve(active)
+            with np.errstate(divide="ignore", invalid="ignore"):
+                rmax = np.max(
+                    np.abs(1 - self.T[..., 2 : self.L1] / T1[..., 2 : self.L1]),
+                    axis=-1,
+                )
+            active &= rmax > self.eps
+            if not active.any():
+                break
+        else:
+            logger.warning(
+                f"RMAX is above eps after {MAX_ITERATIONS} iterations "
+                f"at TIME {self.time} in {np.count_nonzero(active)} systems"
+            )
+
+    def run(self) -> BinaryOutput:
+        self.T0 = np.zeros(self.batch + (self.L1 + 1,))
+        self.T = self.T0.copy()
+        nodes = np.arange(1, self.L1 + 1)
+        if not self.steady:
+            self.T0[..., nodes] = self._eval("T_INIT", nodes)
+            self.T = self.T0.copy()
+        self.steps = 0
+        if self.steady:
+            self.advance()
+            return self.output()
+        while self.time <= self.alltime - 0.5 * self.dt:
+            self.advance()
+            self.steps += 1
+            change = np.max(np.abs(self.T - self.T0)) / self.dt
+            self.T0 = self.T.copy()
+            if change < self.steady_tol:
+                break
+        return self.output()
+
+    def output(self) -> BinaryOutput:
+        """The variables of ALLFILE, fields with the batch axes first."""
+        nodes = np.arange(1, self.L1 + 1)
+        T = self.T[..., nodes]
+        Ta = self._eval("FAN", nodes)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            variables = {
+                "X": self.X[nodes],
+                "T": T,
+                "Ta": Ta,
+                "delT": np.abs(T - Ta),
+                "delT1": 100 * np.abs((T - Ta) / Ta),
+            }
+        return BinaryOutput(self.time, (self.L1,), variables)
+
+
+def solve(
+    problem_sympy: problem.ProblemSympy,
+    solver_params: Optional[problem.SolverParams] = None,
+    params: Optional[Dict[str, object]] = None,
+    cache: ProblemCodeGenCache = default_cache,
+) -> BinaryOutput:
+    """Solves a 1D problem in process, the NumPy counterpart of gen_template."""
+    return NumpySolver(cache.get(problem_sympy), solver_params, params).run()
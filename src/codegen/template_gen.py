@@ -1,19 +1,82 @@
+import dataclasses
+import logging
 import os
+import shlex
+from typing import Optional
 
 import jinja2
 
+from codegen.cache import ProblemCodeGenCache, default_cache
 from models import codegen_problem, problem
 
+TEMPLATES_DIR = os.path.join(os.path.dirname(__file__), os.pardir, "templates")
+TEMPLATE_NAMES = {1: "1dimension.jinja2", 2: "2dimensions.jinja2"}
+GENERATED_DIR = os.path.join(os.path.dirname(__file__), os.pardir, "generated")
+SOLVER_FILE_NAME = "fortran_solver.f95"
 
-def gen_template(problem_sympy: problem.ProblemSympy):
-    problem_codegen = codegen_problem.ProblemCodeGen(problem_sympy)
+logger = logging.getLogger(__name__)
 
-    with open("src/templates/1dimension.jinja2", "r") as f:
+
+def fortran_real(value: float) -> str:
+    # REAL(8) literal, "0.1" alone would be a single precision constant
+    mantissa, _, exponent = repr(float(value)).partition("e")
+    return f"{mantissa}D{exponent or 0}"
+
+
+jinja_env = jinja2.Environment()
+jinja_env.filters["fortran_real"] = fortran_real
+
+
+def render_template(
+    problem_codegen: codegen_problem.ProblemCodeGen,
+    solver_params: Optional[problem.SolverParams] = None,
+) -> str:
+    dimensions_count = problem_codegen.coordinate_system.dimensions_count()
+    template_file = os.path.join(TEMPLATES_DIR, TEMPLATE_NAMES[dimensions_count])
+    with open(template_file, "r") as f:
         template = f.read()
-    jinja_template = jinja2.Template(template)
+    jinja_template = jinja_env.from_string(template)
+
+    solver_params = solver_params or problem.SolverParams()
+    if (
+        solver_params.linear_solver == problem.LinearSolver.PCG
+        and not problem_codegen.is_spd
+    ):
+        logger.warning(
+            "The discrete operator is not symmetric positive definite, "
+            "PCG is replaced with SOR"
+        )
+        solver_params = dataclasses.replace(
+            solver_params, linear_solver=problem.LinearSolver.SOR
+        )
+    if problem_codegen.coordinate_system.is_stationary():
+        # solved without a time loop
+        solver_params = dataclasses.replace(
+            solver_params,
+            snapshot_every=0,
+            snapshot_interval=0.0,
+            theta=1.0,
+            adaptive_dt=False,
+            steady_tol=0.0,
+        )
+    return jinja_template.render(code_model=problem_codegen, params=solver_params)
+
 
-    template = jinja_template.render(code_model=problem_codegen)
+def gen_template(
+    problem_sympy: problem.ProblemSympy,
+    cache: ProblemCodeGenCache = default_cache,
+    out_dir: str = GENERATED_DIR,
+    solver_params: Optional[problem.SolverParams] = None,
+) -> str:
+    problem_codegen = cache.get(problem_sympy)
+    template = render_template(problem_codegen, solver_params)
 
-    with open("src/generated/fortran_solver.f95", "w") as fw:
+    os.makedirs(out_dir, exist_ok=True)
+    solver_file = os.path.join(out_dir, SOLVER_FILE_NAME)
+    with open(solver_file, "w") as fw:
         fw.write(template)
-    os.system("fprettify src/generated/fortran_solver.f95 -l 132")
+    os.system(f"fprettify {shlex.quote(solver_file)} -l 132")
+    # the compiled solver reads it at startup, rewrite it to rerun with
+    # another grid or time step without regeneration
+    problem_sympy.grid_params.write_namelist(out_dir, problem_sympy.coordinate_system)
+    return solver_file
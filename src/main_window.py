@@ -11,9 +11,13 @@ from PyQt5 import QtCore, QtWidgets
 from generated.UI import Ui_MainWindow
 
 import models.coordinate_systems as cs
-from codegen.template_gen import gen_template
+from binary_reader import read_binary_output
+from codegen.build import BuildConfig, CompilerProfile
+from codegen.cache import ProblemCodeGenCache, default_cache
+from codegen.template_gen import GENERATED_DIR, SOLVER_FILE_NAME
 from models import problem
-from tecplot_reader import read_tecplot
+from solver_runner import SolverProcess, SolverProgressPanel, start_codegen
+from tecplot_reader import read_tecplot_cached
 
 logger = logging.getLogger(__name__)
 
@@ -25,8 +29,14 @@ class FormulasState(enum.Enum):
 
 
 class MainWindow(QtWidgets.QMainWindow):
-    def __init__(self):
+    def __init__(
+        self,
+        generated_dir: str = GENERATED_DIR,
+        codegen_cache: ProblemCodeGenCache = default_cache,
+    ):
         super(MainWindow, self).__init__()
+        self.generated_dir = generated_dir
+        self.codegen_cache = codegen_cache
         self.ui = Ui_MainWindow()
         self.ui.setupUi(self)
         self._setup_events()
@@ -35,6 +45,15 @@ class MainWindow(QtWidgets.QMainWindow):
     def _setup_variables(self):
         self.strs_problem_model = problem.StrsModelsFromLabs["2.1"]
         self.FormulasState = FormulasState.Undefined
+        self.solver_process: Optional[SolverProcess] = None
+        self.progress_panel = SolverProgressPanel(self)
+        self.progress_panel.cancel_button.clicked.connect(self.CancelRun)
+        self.addDockWidget(QtCore.Qt.BottomDockWidgetArea, self.progress_panel)
+        self.progress_panel.hide()
+        self.ui.CompilerProfileCombo.addItems(
+            [profile.value for profile in CompilerProfile]
+        )
+        self.ui.CompilerProfileCombo.setCurrentText(CompilerProfile.O2.value)
         self.ShowTextAction()
 
     # region property
@@ -153,6 +172,13 @@ class MainWindow(QtWidgets.QMainWindow):
                 cond_text.setPlainText(insert_col.pop())
         return L, R
 
+    @property
+    def SolverBuildConfig(self) -> BuildConfig:
+        return BuildConfig(
+            profile=CompilerProfile(self.ui.CompilerProfileCombo.currentText()),
+            openmp=self.ui.OpenMPCheckBox.isChecked(),
+        )
+
     # endregion property
 
     # region Events
@@ -250,20 +276,36 @@ class MainWindow(QtWidgets.QMainWindow):
             x_step=self.ui.XGridStepSpin.value(), t_step=self.ui.tGridStepSpin.value()
         )
         sympy_model = problem.ProblemSympy(self.strs_problem_model, grid_params)
-        try:
-            gen_template(sympy_model)
-        except Exception as err:
-            mbox = QtWidgets.QMessageBox(self)
-            mbox.setIcon(mbox.Warning)
-            mbox.setText(str(err))
-        else:
-            mbox = QtWidgets.QMessageBox(self)
-            mbox.setIcon(mbox.Information)
-            mbox.setText(f"Program successfully generated.")
+        solver_params = problem.SolverParams(
+            openmp=self.ui.OpenMPCheckBox.isChecked()
+        )
+        self.ui.GenerateCodeButton.setEnabled(False)
+        self.codegen_worker = start_codegen(
+            self,
+            sympy_model,
+            self.GenerateCodeFinished,
+            self.GenerateCodeFailed,
+            solver_params,
+            self.generated_dir,
+            self.codegen_cache,
+        )
+
+    def GenerateCodeFinished(self, solver_file: str):
+        self.ui.GenerateCodeButton.setEnabled(True)
+        mbox = QtWidgets.QMessageBox(self)
+        mbox.setIcon(mbox.Information)
+        mbox.setText(f"Program successfully generated.")
+        mbox.show()
+
+    def GenerateCodeFailed(self, error: str):
+        self.ui.GenerateCodeButton.setEnabled(True)
+        mbox = QtWidgets.QMessageBox(self)
+        mbox.setIcon(mbox.Warning)
+        mbox.setText(error)
         mbox.show()
 
     def RunCode(self):
-        code_file = os.path.abspath("./src/generated/fortran_solver.f95")
+        code_file = os.path.abspath(os.path.join(self.generated_dir, SOLVER_FILE_NAME))
         if not os.path.exists(code_file):
             mbox = QtWidgets.QMessageBox(self)
             mbox.setIcon(mbox.Warning)
@@ -271,26 +313,52 @@ class MainWindow(QtWidgets.QMainWindow):
                 f"Cannot find file {code_file}. May be you didn't run code generation."
             )
             mbox.show()
-        status = os.system(f"cd ./src/generated/ && gfortran {code_file} && ./a.out")
-        if status == 0:
-            mbox = QtWidgets.QMessageBox(self)
-            mbox.setIcon(mbox.Information)
-            mbox.setText(f"Program successfully finished.")
-        else:
-            mbox = QtWidgets.QMessageBox(self)
-            mbox.setIcon(mbox.Warning)
-            mbox.setText(f"Program failed.")
+            return
+        if self.solver_process is not None and self.solver_process.is_running():
+            return
+
+        self.ui.CodeRunButton.setEnabled(False)
+        self.progress_panel.reset()
+        self.progress_panel.show()
+        self.solver_process = SolverProcess(
+            code_file,
+            self,
+            build_config=self.SolverBuildConfig,
+            num_threads=self.ui.ThreadsSpin.value() or None,
+        )
+        self.solver_process.line_received.connect(self.progress_panel.append_line)
+        self.solver_process.progress.connect(self.progress_panel.update_values)
+        self.solver_process.finished.connect(self.RunCodeFinished)
+        self.solver_process.start()
+
+    def RunCodeFinished(self, success: bool, message: str):
+        self.ui.CodeRunButton.setEnabled(True)
+        self.progress_panel.set_finished(message)
+        mbox = QtWidgets.QMessageBox(self)
+        mbox.setIcon(mbox.Information if success else mbox.Warning)
+        mbox.setText(message)
         mbox.show()
 
+    def CancelRun(self):
+        if self.solver_process is not None:
+            self.solver_process.cancel()
+
     def ShowGraphs(self):
-        ALL_DAT = os.path.abspath("./src/generated/ALL.DAT")
-        if not os.path.exists(ALL_DAT):
+        ALL_DAT = os.path.abspath(os.path.join(self.generated_dir, "ALL.DAT"))
+        ALL_BIN = os.path.abspath(os.path.join(self.generated_dir, "ALL.BIN"))
+        outputs = [path for path in [ALL_BIN, ALL_DAT] if os.path.exists(path)]
+        if not outputs:
             mbox = QtWidgets.QMessageBox(self)
             mbox.setIcon(mbox.Warning)
             mbox.setText(f"Cannot find file {ALL_DAT}. May be you didn't run code.")
             mbox.show()
+            return
 
-        data = read_tecplot(ALL_DAT, verbose=False)[1][0]
+        # the solver writes only one of them, the newer is from the last run
+        if max(outputs, key=os.path.getmtime) == ALL_BIN:
+            data = read_binary_output(ALL_BIN)
+        else:
+            data = read_tecplot_cached(ALL_DAT)[1][0]
 
         fig, (ax1, ax2, ax3) = plt.subplots(
             1, 3, figsize=(12, 4),  # gridspec_kw={"wspace": 0.35}
@@ -305,7 +373,7 @@ class MainWindow(QtWidgets.QMainWindow):
         ax2.set_xlabel("X")
         ax2.set_ylabel("Тa (аналитика)")
 
-        ax3.plot(data["X"], (data["T"] - data["Ta"]).abs())
+        ax3.plot(data["X"], abs(data["T"] - data["Ta"]))
         ax3.set_title("Абсолютная погрешность")
         ax3.set_xlabel("X")
         ax3.set_ylabel("|T - Ta|")
@@ -5,6 +5,7 @@ from typing import *
 import sympy
 from sympy.abc import t
 from sympy.codegen.ast import Element
+from sympy.core.function import AppliedUndef
 from sympy.utilities.codegen import codegen
 
 from models import coordinate_systems as cs
@@ -22,6 +23,112 @@ class ConditionKind(enum.Enum):
     Third = "Third"
 
 
+class Dependence(enum.Enum):
+    """Free symbols of a coefficient, from the least to the most volatile."""
+
+    Constant = 0
+    Space = 1
+    Time = 2
+    Solution = 3
+
+    @property
+    def subroutine(self) -> str:
+        # constant and space-only coefficients are both computed once in START
+        return GAMSOR_SUBROUTINES[max(self.value - 1, 0)]
+
+
+# computed once in START, once per time step, on every inner iteration
+GAMSOR_SUBROUTINES = ["GAMSOR_CONST", "GAMSOR_TIME", "GAMSOR"]
+TIME_SYMBOLS = {"TIME", "DT"}
+# the previous time level, fixed during a time step
+TIME_ARRAYS = {"T0"}
+SOLUTION_ARRAYS = {"T"}
+
+
+def classify(expr) -> Dependence:
+    expr = sympy.sympify(expr)
+    arrays = {str(indexed.base) for indexed in expr.atoms(sympy.Indexed)}
+    symbols = {str(symbol) for symbol in expr.free_symbols}
+    if arrays & SOLUTION_ARRAYS or expr.atoms(AppliedUndef):
+        return Dependence.Solution
+    if symbols & TIME_SYMBOLS or arrays & TIME_ARRAYS:
+        return Dependence.Time
+    if arrays or symbols:
+        return Dependence.Space
+    return Dependence.Constant
+
+
+def max_dependence(*dependences: Dependence) -> Dependence:
+    return max(dependences, key=lambda dependence: dependence.value)
+
+
+@dataclasses.dataclass
+class CoefficientGroup:
+    """Arrays of the discrete analogue computed in one GAMSOR_* subroutine."""
+
+    subroutine: str
+    # array name -> fortran code, GAMI at faces, the rest at nodes after CSE
+    codes: Dict[str, str]
+    temps: List[Tuple[str, str]]
+    flops_per_cell: Tuple[int, int]
+
+
+def _is_flux_divergence(derivative: sympy.Derivative) -> bool:
+    """d/dv(k*du/dv) or d2u/dv2, k may depend on u but not on its derivatives."""
+    if len(derivative.variable_count) != 1:
+        return False
+    var, count = derivative.variable_count[0]
+    if count == 2:
+        return isinstance(derivative.expr, AppliedUndef)
+    inner = list(derivative.expr.atoms(sympy.Derivative))
+    if (
+        count != 1
+        or len(inner) != 1
+        or inner[0].variable_count != ((var, 1),)
+        or not isinstance(inner[0].expr, AppliedUndef)
+    ):
+        return False
+    return not sympy.simplify(derivative.expr / inner[0]).atoms(sympy.Derivative)
+
+
+def _strip_fluxes(expr: sympy.Expr) -> sympy.Expr:
+    return expr.replace(
+        lambda sub: isinstance(sub, sympy.Derivative) and _is_flux_divergence(sub),
+        lambda sub: sympy.S.Zero,
+    )
+
+
+def is_spd_operator(equation: sympy.Equality) -> bool:
+    """The discrete analogue of the equation is symmetric positive definite.
+
+    Symmetric: derivatives of u enter the right side only as diffusion
+    fluxes, no convection, so the same face coefficient links both
+    neighbours. Positive definite: AP exceeds the sum of the links by
+    AP0 - APS > 0, a positive constant Sp is either lagged or dominated by
+    the transient term (see _equation_processing), other u terms are lagged.
+    """
+    reaction = _strip_fluxes(equation.rhs)
+    if reaction.atoms(sympy.Derivative):
+        return False
+    for u in reaction.atoms(AppliedUndef):
+        sp = sympy.expand(reaction).coeff(u)
+        if not (sp.is_nonpositive or (sp.is_constant() and sp > 0)):
+            return False
+    return True
+
+
+def _stationary_form(
+    equation: sympy.Equality, coords: cs.CoordinateSystem
+) -> sympy.Equality:
+    """Eq(0, diffusion + sources) with a positive diffusion coefficient."""
+    expr = sympy.expand(equation.rhs - equation.lhs)
+    u = sympy.Function("u")(*coords.axises())
+    diffusion = sympy.Derivative(u, coords.axises()[0], coords.axises()[0])
+    if expr.coeff(diffusion).could_extract_minus_sign():
+        expr = -expr
+    return sympy.Eq(0, expr)
+
+
 def calc_in_point(expr, coords, use_U=False):
     subs_vars = {}
     for axis, index in zip(coords.axises(), coords.indexes()):
@@ -39,7 +146,50 @@ def _to_fcode(expr):
     return sympy.fcode(sympy.simplify(expr).evalf()).replace("\n", "").replace("@", "")
 
 
+def count_flops(exprs: Iterable[sympy.Expr]) -> int:
+    return sum(sympy.count_ops(expr) for expr in exprs)
+
+
+def _cse_fcode(
+    exprs: List[sympy.Expr], prefix: str
+) -> Tuple[List[Tuple[str, str]], List[str], Tuple[int, int]]:
+    """Common-subexpression elimination over expressions of one loop body.
+
+    Returns fortran code of the shared temporaries (name, code), code of the
+    reduced expressions and the operation count before and after elimination.
+    """
+    exprs = [sympy.simplify(expr).evalf() for expr in exprs]
+    temps, reduced = sympy.cse(exprs, symbols=sympy.numbered_symbols(prefix))
+    flops = (count_flops(exprs), count_flops([val for _, val in temps] + reduced))
+    return (
+        [(str(name), _to_fcode(val)) for name, val in temps],
+        [_to_fcode(expr) for expr in reduced],
+        flops,
+    )
+
+
+def _use_metrics(expr: sympy.Expr) -> sympy.Expr:
+    """Rewrites XU(I + 1) through the control volume width DXU(I) of METRICS."""
+    xu_i = sympy.Symbol("I")
+    XU, DXU = sympy.IndexedBase("XU"), sympy.IndexedBase("DXU")
+    if not expr.has(XU[xu_i + 1]):
+        return expr
+    rewritten = sympy.simplify(expr.subs(XU[xu_i + 1], XU[xu_i] + DXU[xu_i]))
+    return rewritten if count_flops([rewritten]) < count_flops([expr]) else expr
+
+
 class BoundaryCondition:
+    # shared temporaries (name, code) of CON/APS or expression, see _cse_fcode
+    temps: List[Tuple[str, str]]
+    # CON at the previous time level, for the explicit part of the theta scheme
+    old_temps: List[Tuple[str, str]]
+    CON_OLD: str
+    # of CON and APS terms of 2nd/3rd kind conditions
+    dependence: Dict[str, Dependence]
+    # sympy forms of CON, APS, CON_OLD and T (expression of 1st kind), see
+    # codegen.numpy_backend
+    exprs: Dict[str, sympy.Expr]
+
     def __init__(
         self,
         cond_eq: sympy.Equality,
@@ -47,6 +197,7 @@ class BoundaryCondition:
         bound_side: BoundSide,
     ):
         self.bound_side = bound_side
+        self.dependence = {}
         self._set_axis_and_point(cond_eq, coords)
 
         if self.kind != ConditionKind.First.name:
@@ -72,12 +223,13 @@ class BoundaryCondition:
         U_pattern = sympy.WildFunction("U_pattern", nargs=len(coords.axises()))
 
         res = cond_eq.lhs.match(
-            a1 * U_pattern ** u_pow + a2 * sympy.Derivative(U_pattern, axis)
+            a1 * U_pattern**u_pow + a2 * sympy.Derivative(U_pattern, axis)
         )
         if res is None:
             raise ValueError(f"Cannot parse {cond_eq}")
         self.a1 = res[a1]
         self.a2 = res[a2]
+        self.u_pow = res.get(u_pow, sympy.Integer(1))
         u_with_args = res[U_pattern]
 
         if self.a1 != 0 and self.a2 == 0:
@@ -130,13 +282,26 @@ class BoundaryCondition:
             con += aps * T
             aps = sympy.simplify(0)
 
-        self.CON = _to_fcode(con)
-        self.APS = _to_fcode(aps)
-        self.T = _to_fcode(T - (aps * T + con) * (X[axis_h_inx] - X[axis_inx]))
+        self.dependence = {"CON": classify(con), "APS": classify(aps)}
+        prefix = f"CSE{self.bound_side.value}{coords.axises().index(self.axis)}_"
+        self.temps, (self.CON, self.APS), _ = _cse_fcode([con, aps], prefix)
+        con_old = con.subs(
+            {sympy.Symbol("TIME"): sympy.Symbol("TIME") - sympy.Symbol("DT")}
+        ).subs(sympy.IndexedBase("T"), sympy.IndexedBase("T0"))
+        self.old_temps, (self.CON_OLD,), _ = _cse_fcode([con_old], f"{prefix}OLD_")
+        bound_T = T - (aps * T + con) * (X[axis_h_inx] - X[axis_inx])
+        self.T = _to_fcode(bound_T)
+        self.exprs = {"CON": con, "APS": aps, "CON_OLD": con_old, "T": bound_T}
+
+    @property
+    def is_linear(self) -> bool:
+        return self.u_pow == 1 and Dependence.Solution not in self.dependence.values()
 
     # First kind
     def _set_function_code(self, cond_eq: sympy.Equality, coords: cs.CoordinateSystem):
-        self.expression = _to_fcode(calc_in_point(cond_eq.rhs, coords))
+        prefix = f"CSE{self.bound_side.value}{coords.axises().index(self.axis)}_"
+        self.exprs = {"T": calc_in_point(cond_eq.rhs, coords)}
+        self.temps, (self.expression,), _ = _cse_fcode([self.exprs["T"]], prefix)
 
 
 class ProblemCodeGen:
@@ -151,9 +316,23 @@ class ProblemCodeGen:
 
     initial_condition: Optional[BoundaryCondition] = None
     analytical_solution: Optional[str] = None
+    analytical_expr: sympy.Expr = sympy.nan
+
+    # sympy forms of the coefficient codes, see codegen.numpy_backend
+    coefficient_exprs: Dict[str, sympy.Expr]
+
+    # GAMSOR_SUBROUTINES name -> coefficients computed there
+    coefficients: Dict[str, CoefficientGroup]
+    # no coefficient depends on T, so one solve per time step is exact
+    is_linear: bool
+    # the discrete operator is symmetric positive definite, see is_spd_operator
+    is_spd: bool
+    # APS holds a positive Sp, DIF lags it into B when it outweighs AP0
+    lag_sp: bool
 
     def __init__(self, sympy_problem: problem.ProblemSympy):
         self.coordinate_system = sympy_problem.coordinate_system
+        self.grid_params = sympy_problem.grid_params
         if sympy_problem.initial_condition is not None:
             self.initial_condition = BoundaryCondition(
                 sympy_problem.initial_condition, self.coordinate_system, BoundSide.L
@@ -180,6 +359,26 @@ class ProblemCodeGen:
         self._equation_processing(sympy_problem)
         self._set_analytical_solution(sympy_problem)
 
+    # undefined functions like u(x, y) are created at runtime and cannot be
+    # pickled by reference, so the disk cache keeps sympy state as srepr
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        for name in ["GamX", "Rho", "analytical_expr"]:
+            state[name] = sympy.srepr(state[name])
+        state["coefficient_exprs"] = {
+            array: sympy.srepr(expr) for array, expr in self.coefficient_exprs.items()
+        }
+        return state
+
+    def __setstate__(self, state):
+        for name in ["GamX", "Rho", "analytical_expr"]:
+            state[name] = sympy.sympify(state[name])
+        state["coefficient_exprs"] = {
+            array: sympy.sympify(expr)
+            for array, expr in state["coefficient_exprs"].items()
+        }
+        self.__dict__.update(state)
+
     def _set_analytical_solution(self, sympy_problem: problem.ProblemSympy):
         # fortran analytical_solution
         analytical_formula = (
@@ -188,13 +387,19 @@ class ProblemCodeGen:
             else sympy.nan
         )
 
+        axises = self.coordinate_system.axises()
+        # free parameters are only bound by codegen.numpy_backend
+        params = sorted(
+            sympy.sympify(analytical_formula).free_symbols - set(axises), key=str
+        )
         [(file_name, func_code), (header_name, header_code)] = codegen(
             ("FAN", analytical_formula),  # .evalf() to double
             language="F95",
             header=False,
-            argument_sequence=self.coordinate_system.axises(),
+            argument_sequence=axises + params,
         )
         self.analytical_solution = "! generated !\n" + func_code
+        self.analytical_expr = analytical_formula
 
     def _equation_processing(self, sympy_problem: problem.ProblemSympy):
         equation = sympy_problem.equation
@@ -204,12 +409,28 @@ class ProblemCodeGen:
         U_pattern = sympy.WildFunction("U_pattern", nargs=len(coords.axises()))
         x_var = sympy.Symbol("x")
 
-        res = equation.match(
-            sympy.Eq(
-                rc * sympy.Derivative(U_pattern, t),
-                kx * sympy.Derivative(U_pattern, x_var, x_var) + Sp_ * U_pattern + Sc_,
+        if coords.is_stationary():
+            equation = _stationary_form(equation, coords)
+            u = sympy.Function("u")(*coords.axises())
+            diffusion = sympy.Derivative(u, x_var, x_var)
+            rest = sympy.expand(
+                equation.rhs - equation.rhs.coeff(diffusion) * diffusion
+            )
+            res = {
+                rc: sympy.Integer(0),
+                kx: equation.rhs.coeff(diffusion),
+                Sp_: rest.coeff(u),
+                Sc_: rest - rest.coeff(u) * u,
+            }
+        else:
+            res = equation.match(
+                sympy.Eq(
+                    rc * sympy.Derivative(U_pattern, t),
+                    kx * sympy.Derivative(U_pattern, x_var, x_var)
+                    + Sp_ * U_pattern
+                    + Sc_,
+                )
             )
-        )
 
         self.GamX = res[kx]
         self.Rho = res[rc]
@@ -220,14 +441,64 @@ class ProblemCodeGen:
         T = sympy.IndexedBase("T")[xu_i]
 
         Sc = sympy.integrate(res[Sc_], (x_var, XU[xu_i], XU[xu_i + 1]))
-        Sc = sympy.integrate(Sc, (t, "TIME", "TIME+DT")) / DT
-
         Sp = sympy.integrate(res[Sp_], (x_var, XU[xu_i], XU[xu_i + 1]))
-        Sp = sympy.integrate(Sp, (t, "TIME", "TIME+DT")) / DT
-
+        if not coords.is_stationary():
+            # TIME is already advanced to the new level, average over the step
+            Sc = sympy.integrate(Sc, (t, "TIME-DT", "TIME")) / DT
+            Sp = sympy.integrate(Sp, (t, "TIME-DT", "TIME")) / DT
+
+        self.is_spd = is_spd_operator(equation)
+
+        # A positive Sp is lagged into Sc to keep AP dominant. In transient
+        # problems the transient term does that while AP0 = RHO*DX/DT >
+        # THETA*Sp*DX, which depends on the runtime DT (T_STEP of the
+        # namelist, adaptive steps), so DIF checks it and lags Sp itself.
+        self.lag_sp = False
         if res[Sp_].is_constant() and res[Sp_] > 0:
-            Sc += Sp * T
-            Sp = sympy.simplify(0)
+            if coords.is_stationary():
+                Sc += Sp * T
+                Sp = sympy.simplify(0)
+            else:
+                self.lag_sp = True
+
+        self._group_coefficients(
+            {
+                "GAMI": calc_in_point(self.GamX, coords, use_U=True),
+                "APS": sympy.simplify(calc_in_point(Sp, coords, use_U=True)),
+                "CON": sympy.simplify(calc_in_point(Sc, coords, use_U=True)),
+                "RHO": calc_in_point(self.Rho, coords),
+            }
+        )
+
+    def _group_coefficients(self, exprs: Dict[str, sympy.Expr]):
+        exprs = {array: _use_metrics(expr) for array, expr in exprs.items()}
+        self.coefficient_exprs = exprs
+        dependence = {array: classify(expr) for array, expr in exprs.items()}
+        # boundary terms are added to the boundary cells of the same arrays
+        for cond in self.L_boundary_conditions[:1] + self.R_boundary_conditions[:1]:
+            if cond.kind == ConditionKind.First.name:
+                continue
+            for array in ["CON", "APS"]:
+                dependence[array] = max_dependence(
+                    dependence[array], cond.dependence[array]
+                )
 
-        self.Sp = _to_fcode(sympy.simplify(calc_in_point(Sp, coords, use_U=True)))
-        self.Sc = _to_fcode(sympy.simplify(calc_in_point(Sc, coords, use_U=True)))
+        self.coefficients = {}
+        for subroutine in GAMSOR_SUBROUTINES:
+            arrays = [
+                array for array in exprs if dependence[array].subroutine == subroutine
+            ]
+            node_arrays = [array for array in arrays if array != "GAMI"]
+            temps, node_codes, flops = _cse_fcode(
+                [exprs[array] for array in node_arrays], "CSE"
+            )
+            codes = {array: _to_fcode(exprs[array]) for array in arrays}
+            codes.update(zip(node_arrays, node_codes))
+            self.coefficients[subroutine] = CoefficientGroup(
+                subroutine, codes, temps, flops
+            )
+
+        self.is_linear = not self.coefficients["GAMSOR"].codes and all(
+            cond.is_linear
+            for cond in self.L_boundary_conditions + self.R_boundary_conditions
+        )
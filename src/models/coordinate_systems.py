@@ -7,9 +7,9 @@ from sympy.abc import t as time_axis
 
 @enum.unique
 class CoordinateSystem(enum.Enum):
-    # X = "X"  # not works for a while
+    X = "X"
     Xt = "Xt"
-    # XY = "XY"  # not works for a while
+    # XY = "XY"  # 2D template is written for the transient lab 5.8
     XYt = "XYt"
 
     # RFi = "\u03A1\u03A6" # not works for a while
@@ -1,15 +1,183 @@
 import dataclasses
-from typing import List, Optional
+import enum
+import os
+from typing import Any, Dict, List, Optional
 
 import sympy
 
 import models.coordinate_systems as cs
 
+NAMELIST_FILE_NAME = "GRID_PARAMS.NML"
+# faces of a GridKind.Nodes grid, one per line
+NODES_FILE_NAMES = {"x": "X_NODES.DAT", "y": "Y_NODES.DAT"}
+
+
+@enum.unique
+class GridKind(enum.Enum):
+    """Distribution of control volume faces along an axis, see GRID."""
+
+    Geometric = "Geometric"  # neighbouring widths differ by the factor stretch
+    Tanh = "Tanh"  # tanh of a uniform grid, stretch is the slope
+    Nodes = "Nodes"  # faces listed in nodes, the step is ignored
+
+
+@enum.unique
+class Cluster(enum.Enum):
+    Left = "Left"  # fine cells at XL (YL)
+    Right = "Right"
+    Both = "Both"
+
+
+@dataclasses.dataclass
+class StretchedGrid:
+    kind: GridKind
+    cluster: Cluster = Cluster.Both
+    stretch: Optional[float] = None
+    nodes: Optional[List[float]] = None
+
+    def __post_init__(self):
+        # plain strings from spec files
+        self.kind = GridKind(self.kind)
+        self.cluster = Cluster(self.cluster)
+        if self.kind == GridKind.Nodes:
+            if self.nodes is None or len(self.nodes) < 2:
+                raise ValueError("Nodes grid needs at least two nodes")
+            if any(a >= b for a, b in zip(self.nodes, self.nodes[1:])):
+                raise ValueError("Grid nodes must increase")
+        else:
+            if self.nodes is not None:
+                raise ValueError(f"nodes are only used by {GridKind.Nodes.value} grid")
+            if self.stretch is None or self.stretch <= 0:
+                raise ValueError(f"{self.kind.value} grid needs a positive stretch")
+
 
 @dataclasses.dataclass
 class GridParams:
     x_step: float
     t_step: float
+    # None keeps the default of the generated solver, y_step defaults to x_step
+    y_step: Optional[float] = None
+    eps: Optional[float] = None
+    alltime: Optional[float] = None
+    # None - uniform grid
+    x_grid: Optional[StretchedGrid] = None
+    y_grid: Optional[StretchedGrid] = None
+
+    def __post_init__(self):
+        for axis in NODES_FILE_NAMES:
+            grid = getattr(self, f"{axis}_grid")
+            if isinstance(grid, dict):
+                setattr(self, f"{axis}_grid", StretchedGrid(**grid))
+
+    def namelist(self, coordinate_system: cs.CoordinateSystem) -> str:
+        """GRID_PARAMS namelist read by the generated solvers at startup.
+
+        A solver declares only the entries of its own axes, an unknown name
+        in the namelist is a runtime error, so y_* is left out for 1D.
+        """
+        axises = {str(axis) for axis in coordinate_system.axises()}
+        lines = []
+        for name, value in dataclasses.asdict(self).items():
+            axis = name.split("_")[0]
+            if value is None or (axis in NODES_FILE_NAMES and axis not in axises):
+                continue
+            if name.endswith("_grid"):
+                axis = name[0].upper()
+                lines.append(f"  {axis}_GRID = '{value['kind'].value}',")
+                if value["stretch"] is not None:
+                    lines.append(f"  {axis}_CLUSTER = '{value['cluster'].value}',")
+                    lines.append(f"  {axis}_STRETCH = {float(value['stretch'])!r},")
+            else:
+                lines.append(f"  {name.upper()} = {float(value)!r},")
+        return "&GRID_PARAMS\n" + "\n".join(lines) + "\n/\n"
+
+    def write_namelist(
+        self, out_dir: str, coordinate_system: cs.CoordinateSystem
+    ) -> str:
+        path = os.path.join(out_dir, NAMELIST_FILE_NAME)
+        with open(path, "w") as f:
+            f.write(self.namelist(coordinate_system))
+        axises = {str(axis) for axis in coordinate_system.axises()}
+        for axis, file_name in NODES_FILE_NAMES.items():
+            grid = getattr(self, f"{axis}_grid")
+            if axis in axises and grid is not None and grid.nodes is not None:
+                with open(os.path.join(out_dir, file_name), "w") as f:
+                    f.writelines(f"{float(node)!r}\n" for node in grid.nodes)
+        return path
+
+
+@enum.unique
+class OutputFormat(enum.Enum):
+    Tecplot = "Tecplot"  # formatted ALL.DAT
+    Binary = "Binary"  # unformatted stream ALL.BIN, see binary_reader
+
+
+@enum.unique
+class LogLevel(enum.Enum):
+    Iterations = "Iterations"  # RMAX of every inner iteration and every step
+    Steps = "Steps"  # OUTPUT line every output_every time steps
+    Final = "Final"  # OUTPUT line of the last time step only
+
+
+@enum.unique
+class LinearSolver(enum.Enum):
+    """Inner iteration of the 2D solver."""
+
+    SOR = "SOR"  # point over-relaxation
+    LineTDMA = "LineTDMA"  # TDMA along I-lines, then along J-lines
+    Multigrid = "Multigrid"  # additive correction multigrid V-cycle
+    PCG = "PCG"  # Jacobi preconditioned conjugate gradients, SOR if not SPD
+
+
+@dataclasses.dataclass
+class SolverParams:
+    """Options of the generated solver which need no sympy processing."""
+
+    output_format: OutputFormat = OutputFormat.Tecplot
+    # append the field to SNAPSHOTS.BIN every N time steps (0 - never) ...
+    snapshot_every: int = 0
+    # ... or every given interval of simulated time (0 - never)
+    snapshot_interval: float = 0.0
+    log_level: LogLevel = LogLevel.Iterations
+    output_every: int = 1
+    # max errors against FAN in OUTPUT, a loop over the whole field
+    compute_errors: bool = True
+    # 2D: OpenMP directives and red-black SOR, compile with -fopenmp
+    openmp: bool = False
+    linear_solver: LinearSolver = LinearSolver.SOR
+    # 2D SOR and LineTDMA: relaxation factor in (0, 2), 0 - estimated by the solver
+    omega: float = 0.0
+    # weight of the new time level: 1 - implicit, 0.5 - Crank-Nicolson,
+    # below 0.5 stable only for small time steps
+    theta: float = 1.0
+    # control DT by step doubling: error tolerance of a step, DT bounds
+    # (0 - 1e-3*t_step and 0.1*alltime), logged to DT.OUT
+    adaptive_dt: bool = False
+    dt_tol: float = 1e-4
+    dt_min: float = 0.0
+    dt_max: float = 0.0
+    # stop once max|T - T0|/DT falls below it (0 - march until alltime)
+    steady_tol: float = 0.0
+
+    def __post_init__(self):
+        if self.snapshot_every and self.snapshot_interval:
+            raise ValueError("Set either snapshot_every or snapshot_interval")
+        if self.output_every < 1:
+            raise ValueError("output_every must be positive")
+        if not 0 <= self.omega < 2:
+            raise ValueError("omega must be in (0, 2), or 0 for the estimate")
+        if not 0 <= self.theta <= 1:
+            raise ValueError("theta must be in [0, 1]")
+        if self.dt_tol <= 0:
+            raise ValueError("dt_tol must be positive")
+        if self.dt_min and self.dt_max and self.dt_min > self.dt_max:
+            raise ValueError("dt_min must not exceed dt_max")
+        if self.steady_tol < 0:
+            raise ValueError("steady_tol must not be negative")
+
+    @property
+    def snapshots(self) -> bool:
+        return bool(self.snapshot_every or self.snapshot_interval)
 
 
 @dataclasses.dataclass
@@ -28,20 +196,35 @@ class ProblemStrs:
             raise ValueError("Boundary conditions lists must be the same size")
 
         if (
-            not self.coordinate_system.is_stationary
-            and self.coordinate_system.initial_condition is None
+            not self.coordinate_system.is_stationary()
+            and self.initial_condition is None
         ):
             raise ValueError(
                 "For non stationary problem initial conditions must be set"
             )
 
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "ProblemStrs":
+        fields = {field.name for field in dataclasses.fields(cls)}
+        unknown = set(data) - fields
+        if unknown:
+            raise ValueError(f"Unknown problem fields: {', '.join(sorted(unknown))}")
+        return cls(
+            **{
+                **data,
+                "coordinate_system": cs.CoordinateSystem.from_str(
+                    data["coordinate_system"]
+                ),
+            }
+        )
+
 
 class ProblemSympy:
     equation: sympy.Equality
     L_boundary_conditions: List[sympy.Equality]
     R_boundary_conditions: List[sympy.Equality]
-    initial_condition: Optional[sympy.Equality]
-    analytical_solution: Optional[sympy.core.expr.Expr]
+    initial_condition: Optional[sympy.Equality] = None
+    analytical_solution: Optional[sympy.core.expr.Expr] = None
 
     coordinate_system: cs.CoordinateSystem
     grid_params: GridParams
@@ -67,6 +250,12 @@ class ProblemSympy:
 
         self.coordinate_system = problem_strs.coordinate_system
         self.grid_params = grid_params
+        axises = {str(axis) for axis in self.coordinate_system.axises()}
+        for axis in NODES_FILE_NAMES:
+            if getattr(grid_params, f"{axis}_grid") and axis not in axises:
+                raise ValueError(
+                    f"{axis}_grid is given for a {self.coordinate_system.value} problem"
+                )
 
 
 StrsModelsFromLabs = {
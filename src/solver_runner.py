@@ -0,0 +1,255 @@
+import os
+import re
+from typing import Callable, Dict, Optional
+
+from PyQt5 import QtCore, QtWidgets
+
+from codegen.build import BuildConfig, SolverBuildCache, default_build_cache
+from codegen.cache import ProblemCodeGenCache, default_cache
+from codegen.template_gen import GENERATED_DIR, gen_template
+from models import problem
+
+FLOAT_RE = r"[-+]?(?:\d+\.?\d*|\.\d+)(?:[EeDd][-+]?\d+)?"
+OUTPUT_LINE_RE = re.compile(
+    rf"^\s*({FLOAT_RE})(\s+{FLOAT_RE}){{2}}((\s+{FLOAT_RE}){{2}})?\s*$"
+)
+RMAX_LINE_RE = re.compile(rf"^\s*({FLOAT_RE})\s*$")
+
+
+def _to_float(value: str) -> float:
+    return float(value.replace("D", "E").replace("d", "e"))
+
+
+def parse_solver_line(line: str) -> Optional[Dict[str, float]]:
+    """Parse a stdout (and Q.OUT) line of the generated solvers.
+
+    OUTPUT writes TIME, T(5), TAN(5), delT, delT1 (the last two only with
+    SolverParams.compute_errors) and RT writes RMAX once per inner iteration;
+    headers and other lines give None.
+    """
+    if OUTPUT_LINE_RE.match(line):
+        values = [_to_float(value) for value in line.split()]
+        return dict(zip(["TIME", "T", "Ta", "delT", "delT1"], values))
+    if RMAX_LINE_RE.match(line):
+        return {"RMAX": _to_float(line)}
+    return None
+
+
+class CodeGenWorker(QtCore.QObject):
+    """Runs gen_template on a QThread so sympy does not block the UI."""
+
+    finished = QtCore.pyqtSignal(str)
+    failed = QtCore.pyqtSignal(str)
+
+    def __init__(
+        self,
+        sympy_model: problem.ProblemSympy,
+        solver_params: Optional[problem.SolverParams] = None,
+        out_dir: str = GENERATED_DIR,
+        cache: ProblemCodeGenCache = default_cache,
+    ):
+        super(CodeGenWorker, self).__init__()
+        self.sympy_model = sympy_model
+        self.solver_params = solver_params
+        self.out_dir = out_dir
+        self.cache = cache
+
+    def run(self):
+        try:
+            solver_file = gen_template(
+                self.sympy_model, self.cache, self.out_dir, self.solver_params
+            )
+        except Exception as err:
+            self.failed.emit(str(err))
+        else:
+            self.finished.emit(solver_file)
+
+
+def start_codegen(
+    parent: QtCore.QObject,
+    sympy_model: problem.ProblemSympy,
+    on_finished: Callable[[str], None],
+    on_failed: Callable[[str], None],
+    solver_params: Optional[problem.SolverParams] = None,
+    out_dir: str = GENERATED_DIR,
+    cache: ProblemCodeGenCache = default_cache,
+) -> CodeGenWorker:
+    thread = QtCore.QThread(parent)
+    worker = CodeGenWorker(sympy_model, solver_params, out_dir, cache)
+    worker.moveToThread(thread)
+    # connected before the start, a cache hit may emit right away
+    worker.finished.connect(on_finished)
+    worker.failed.connect(on_failed)
+    thread.started.connect(worker.run)
+    worker.finished.connect(thread.quit)
+    worker.failed.connect(thread.quit)
+    thread.finished.connect(worker.deleteLater)
+    thread.finished.connect(thread.deleteLater)
+    thread.start()
+    return worker
+
+
+class SolverProcess(QtCore.QObject):
+    """Compiles and runs a generated solver as a chain of QProcess stages.
+
+    The compilation stage is skipped when build_cache already holds an
+    executable of the same source and flags. num_threads sets
+    OMP_NUM_THREADS of the solver, by default OpenMP uses all cores.
+    """
+
+    line_received = QtCore.pyqtSignal(str)
+    progress = QtCore.pyqtSignal(dict)
+    finished = QtCore.pyqtSignal(bool, str)
+
+    def __init__(
+        self,
+        code_file: str,
+        parent: Optional[QtCore.QObject] = None,
+        build_config: Optional[BuildConfig] = None,
+        build_cache: SolverBuildCache = default_build_cache,
+        num_threads: Optional[int] = None,
+    ):
+        super(SolverProcess, self).__init__(parent)
+        self.work_dir = os.path.dirname(code_file)
+        self.num_threads = num_threads
+        flags = (build_config or BuildConfig()).flags
+        executable = build_cache.lookup(code_file, flags)
+        self.stages = []
+        if executable is None:
+            executable, tmp_path = build_cache.reserve(code_file, flags)
+            self.stages.append(
+                (
+                    "Compilation",
+                    build_cache.compiler,
+                    build_cache.compile_command(code_file, flags, tmp_path)[1:],
+                    lambda: build_cache.commit(tmp_path, executable),
+                )
+            )
+        self.stages.append(("Solver", executable, [], None))
+        self.process: Optional[QtCore.QProcess] = None
+        self._cancelled = False
+        self._buffer = ""
+
+    def start(self):
+        if self.stages[0][0] != "Compilation":
+            self.line_received.emit("--- Compilation: cached build is up to date")
+        self._start_stage(0)
+
+    def cancel(self):
+        self._cancelled = True
+        if self.process is not None:
+            self.process.kill()
+
+    def is_running(self) -> bool:
+        return (
+            self.process is not None
+            and self.process.state() != QtCore.QProcess.NotRunning
+        )
+
+    def _start_stage(self, stage: int):
+        name, program, args, _ = self.stages[stage]
+        self.process = QtCore.QProcess(self)
+        self.process.setWorkingDirectory(self.work_dir)
+        if self.num_threads:
+            environment = QtCore.QProcessEnvironment.systemEnvironment()
+            environment.insert("OMP_NUM_THREADS", str(self.num_threads))
+            self.process.setProcessEnvironment(environment)
+        self.process.setProcessChannelMode(QtCore.QProcess.MergedChannels)
+        self.process.readyReadStandardOutput.connect(self._read_output)
+        self.process.finished.connect(
+            lambda code, status: self._stage_finished(stage, code, status)
+        )
+        self.process.errorOccurred.connect(
+            lambda error: self._stage_error(stage, error)
+        )
+        self.line_received.emit(f"--- {name}: {program} {' '.join(args)}")
+        self.process.start(program, args)
+
+    def _read_output(self):
+        self._buffer += bytes(self.process.readAllStandardOutput()).decode(
+            errors="replace"
+        )
+        *lines, self._buffer = self._buffer.split("\n")
+        for line in lines:
+            self._emit_line(line)
+
+    def _emit_line(self, line: str):
+        self.line_received.emit(line)
+        values = parse_solver_line(line)
+        if values:
+            self.progress.emit(values)
+
+    def _stage_finished(self, stage: int, exit_code: int, exit_status: int):
+        if self._buffer:
+            self._emit_line(self._buffer)
+            self._buffer = ""
+        name, _, _, on_success = self.stages[stage]
+        if self._cancelled:
+            self.finished.emit(False, f"{name} cancelled.")
+            return
+        if exit_status != QtCore.QProcess.NormalExit or exit_code != 0:
+            self.finished.emit(False, f"{name} failed with code {exit_code}.")
+            return
+        if on_success is not None:
+            on_success()
+        if stage + 1 < len(self.stages):
+            self._start_stage(stage + 1)
+        else:
+            self.finished.emit(True, "Program successfully finished.")
+
+    def _stage_error(self, stage: int, error: int):
+        if error == QtCore.QProcess.FailedToStart:
+            name, program, _, _ = self.stages[stage]
+            self.finished.emit(False, f"{name} failed to start: {program}")
+
+
+class SolverProgressPanel(QtWidgets.QDockWidget):
+    """Live view of TIME, delT and RMAX of the running solver."""
+
+    MAX_LOG_LINES = 5000
+
+    def __init__(self, parent: Optional[QtWidgets.QWidget] = None):
+        super(SolverProgressPanel, self).__init__("Ход расчета", parent)
+        container = QtWidgets.QWidget(self)
+        layout = QtWidgets.QVBoxLayout(container)
+
+        values_layout = QtWidgets.QHBoxLayout()
+        self.value_labels: Dict[str, QtWidgets.QLabel] = {}
+        for name in ["TIME", "delT", "RMAX"]:
+            label = QtWidgets.QLabel(f"{name}: -", container)
+            values_layout.addWidget(label)
+            self.value_labels[name] = label
+        layout.addLayout(values_layout)
+
+        self.log = QtWidgets.QPlainTextEdit(container)
+        self.log.setReadOnly(True)
+        self.log.setMaximumBlockCount(self.MAX_LOG_LINES)
+        layout.addWidget(self.log)
+
+        self.status = QtWidgets.QLabel(container)
+        layout.addWidget(self.status)
+
+        self.cancel_button = QtWidgets.QPushButton("Остановить", container)
+        self.cancel_button.setEnabled(False)
+        layout.addWidget(self.cancel_button)
+
+        self.setWidget(container)
+
+    def reset(self):
+        self.log.clear()
+        for name, label in self.value_labels.items():
+            label.setText(f"{name}: -")
+        self.status.setText("Выполняется...")
+        self.cancel_button.setEnabled(True)
+
+    def append_line(self, line: str):
+        self.log.appendPlainText(line)
+
+    def update_values(self, values: Dict[str, float]):
+        for name, value in values.items():
+            if name in self.value_labels:
+                self.value_labels[name].setText(f"{name}: {value:.6E}")
+
+    def set_finished(self, message: str):
+        self.status.setText(message)
+        self.cancel_button.setEnabled(False)
@@ -4,8 +4,26 @@ author: awaldm
 date: Feb 2014
 
 """
+import dataclasses
+import json
+import mmap
+import os
+import re
+import tempfile
+import warnings
+from typing import List, Optional, Union
+
+import numpy as np
 import pandas as pd
 
+# Start of a line beginning with a keyword, a quoted variable name or a comment.
+# Anchoring on "\n" instead of re.MULTILINE "^" keeps the scan of large data
+# blocks fast; the first line of the file is checked separately.
+HEADER_START_RE = re.compile(rb"\n[ \t]*[A-Za-z\"'#]")
+KEYWORD_RE = re.compile(r"\s*([A-Za-z]*)")
+ZONE_TITLE_RE = re.compile(r'\s*"([^"]*)"')
+NOT_A_NUMBER_PREFIXES = (b"nan", b"inf", b"-nan", b"-inf", b"+nan", b"+inf")
+
 
 def parse_vars(vars_in):
     variables = [item.strip() for item in vars_in]
@@ -33,7 +51,12 @@ def is_number(s):
     return False
 
 
-def read_tecplot(filename, verbose):
+def read_tecplot(filename, verbose, engine="python"):
+    if engine == "numpy":
+        return read_tecplot_numpy(filename, verbose)
+    elif engine != "python":
+        raise ValueError(f"Unknown tecplot reader engine {engine}")
+
     datafile = open(filename, "r")
 
     struct = 1
@@ -206,6 +229,308 @@ def read_tecplot(filename, verbose):
     return zones, dfs, els
 
 
+def _header_value(line, key):
+    return int(line.split(key)[-1].split(",")[0])
+
+
+def parse_numbers(block):
+    """Parse a whitespace separated block of numbers into float64.
+
+    The fast path hands the whole block to numpy; blocks with tokens numpy
+    cannot parse (e.g. Fortran ****** overflow) are coerced token by token
+    to NaN the same way the python engine does.
+    """
+    try:
+        with warnings.catch_warnings():
+            warnings.simplefilter("error", DeprecationWarning)
+            return np.fromstring(block, sep=" ")
+    except (ValueError, DeprecationWarning):
+        return pd.to_numeric(
+            pd.Series(block.decode(errors="replace").split()), errors="coerce"
+        ).to_numpy(dtype=np.float64)
+
+
+def _zone_frames(block, variables, nodes, elements):
+    values = parse_numbers(block)
+    if nodes is None:
+        return pd.DataFrame(values.reshape(-1, len(variables)), columns=variables), None
+    data_size = nodes * len(variables)
+    data = pd.DataFrame(values[:data_size].reshape(nodes, -1), columns=variables)
+    elems = values[data_size:]
+    if elements:
+        elems = elems.reshape(elements, -1)
+    return data, elems.astype(np.int64)
+
+
+def _header_lines(buffer):
+    starts = [0] if HEADER_START_RE.match(b"\n" + buffer[:1024]) else []
+    starts += [match.start() + 1 for match in HEADER_START_RE.finditer(buffer)]
+
+    lines = []
+    for start in starts:
+        end = buffer.find(b"\n", start)
+        end = len(buffer) if end < 0 else end
+        # Fortran prints NaN / Infinity in data lines
+        if not buffer[start:end].lstrip().lower().startswith(NOT_A_NUMBER_PREFIXES):
+            lines.append((start, end))
+    return lines
+
+
+@dataclasses.dataclass
+class ZoneIndexEntry:
+    number: int
+    title: str
+    # the rest of the ZONE line, as read_tecplot puts it into zones
+    header: str
+    nodes: Optional[int]
+    elements: Optional[int]
+    # byte range of the numeric block of the zone
+    data_start: int
+    data_end: int
+
+
+@dataclasses.dataclass
+class ZoneIndex:
+    variables: List[str]
+    zones: List[ZoneIndexEntry]
+    # identity of the indexed file, see load_zone_index
+    size: int = 0
+    mtime_ns: int = 0
+
+    def find(self, zone: Union[int, str]) -> ZoneIndexEntry:
+        if isinstance(zone, str):
+            for entry in self.zones:
+                if zone in (entry.title, entry.header):
+                    return entry
+            raise KeyError(f"No zone with title {zone}")
+        return self.zones[zone]
+
+
+def _zone_title(header):
+    title = ZONE_TITLE_RE.match(header)
+    return title.group(1) if title else header
+
+
+def _scan_zones(buffer, verbose=False):
+    variables = []
+    zones = []
+    reading_vars = False
+    headers = _header_lines(buffer)
+    for i, (line_start, line_end) in enumerate(headers):
+        line = buffer[line_start:line_end].decode(errors="replace")
+        if verbose:
+            print("Header line: " + line.strip())
+
+        keyword = KEYWORD_RE.match(line).group(1)
+        if keyword == "VARIABLES":
+            variables = line.split('"')[1::2]
+            reading_vars = True
+        elif keyword == "ZONE":
+            header = line.split("ZONE T=", 1).pop().strip()
+            zones.append(
+                ZoneIndexEntry(
+                    len(zones), _zone_title(header), header, None, None, 0, 0
+                )
+            )
+            reading_vars = False
+        elif reading_vars and line.lstrip().startswith(('"', "'")):
+            variables += line.split('"')[1::2]
+        if zones and "Nodes=" in line:
+            zones[-1].nodes = _header_value(line, "Nodes=")
+        if zones and "Elements=" in line:
+            zones[-1].elements = _header_value(line, "Elements=")
+
+        data_end = headers[i + 1][0] if i + 1 < len(headers) else len(buffer)
+        if zones and not zones[-1].data_end and buffer[line_end:data_end].strip():
+            zones[-1].data_start, zones[-1].data_end = line_end, data_end
+    return variables, zones
+
+
+def _open_mmap(filename):
+    with open(filename, "rb") as datafile:
+        if datafile.seek(0, 2) == 0:
+            return None
+        return mmap.mmap(datafile.fileno(), 0, access=mmap.ACCESS_READ)
+
+
+def build_zone_index(filename, verbose=False):
+    stat = os.stat(filename)
+    buffer = _open_mmap(filename)
+    if buffer is None:
+        return ZoneIndex([], [], stat.st_size, stat.st_mtime_ns)
+    variables, zones = _scan_zones(buffer, verbose)
+    buffer.close()
+    return ZoneIndex(variables, zones, stat.st_size, stat.st_mtime_ns)
+
+
+def zone_index_path(filename):
+    return filename + ".zidx"
+
+
+def load_zone_index(filename):
+    """Zone index of filename, kept in a JSON sidecar next to it.
+
+    The sidecar is rebuilt whenever the size or mtime of the file changes,
+    e.g. after the solver has run again.
+    """
+    stat = os.stat(filename)
+    try:
+        with open(zone_index_path(filename), "r") as f:
+            data = json.load(f)
+        if (data["size"], data["mtime_ns"]) == (stat.st_size, stat.st_mtime_ns):
+            return ZoneIndex(
+                data["variables"],
+                [ZoneIndexEntry(**entry) for entry in data["zones"]],
+                data["size"],
+                data["mtime_ns"],
+            )
+    except (OSError, ValueError, KeyError, TypeError):
+        pass
+
+    index = build_zone_index(filename)
+    try:
+        with open(zone_index_path(filename), "w") as f:
+            json.dump(dataclasses.asdict(index), f)
+    except OSError:
+        pass
+    return index
+
+
+def _read_indexed_zones(filename, index, entries):
+    if not entries:
+        return [], [], []
+    buffer = _open_mmap(filename)
+    zones, dfs, els = [], [], []
+    for entry in entries:
+        zones.append(entry.header)
+        if not entry.data_end:
+            continue
+        data, elems = _zone_frames(
+            buffer[entry.data_start : entry.data_end],
+            index.variables,
+            entry.nodes,
+            entry.elements,
+        )
+        dfs.append(data)
+        if elems is not None and len(elems):
+            els.append(elems)
+    buffer.close()
+    return zones, dfs, els
+
+
+def read_zone(filename, zone):
+    """Load one zone, by number (0-based) or title, without parsing the others."""
+    index = load_zone_index(filename)
+    return _read_indexed_zones(filename, index, [index.find(zone)])[1][0]
+
+
+def read_zones(filename, zones=slice(None)):
+    """Load a slice or a list of zones (numbers or titles) as (zones, dfs, els)."""
+    index = load_zone_index(filename)
+    if isinstance(zones, slice):
+        entries = index.zones[zones]
+    else:
+        entries = [index.find(zone) for zone in zones]
+    return _read_indexed_zones(filename, index, entries)
+
+
+def read_tecplot_numpy(filename, verbose=False):
+    """Vectorized counterpart of read_tecplot.
+
+    Only header lines are handled in python, the numeric block of every zone
+    is parsed by numpy in one call. Returns the same (zones, dfs, els) with
+    float64 columns; element connectivity comes as integer arrays.
+    """
+    index = build_zone_index(filename, verbose)
+    return _read_indexed_zones(filename, index, index.zones)
+
+
+def parsed_cache_dir(filename):
+    return filename + ".npcache"
+
+
+def _load_parsed_cache(filename, stat):
+    cache_dir = parsed_cache_dir(filename)
+    try:
+        with open(os.path.join(cache_dir, "manifest.json"), "r") as f:
+            manifest = json.load(f)
+        if (manifest["path"], manifest["size"], manifest["mtime_ns"]) != (
+            os.path.abspath(filename),
+            stat.st_size,
+            stat.st_mtime_ns,
+        ):
+            return None
+        dfs = [
+            pd.DataFrame(
+                np.load(os.path.join(cache_dir, name), mmap_mode="r"),
+                columns=manifest["variables"],
+                copy=False,
+            )
+            for name in manifest["dfs"]
+        ]
+        els = [np.load(os.path.join(cache_dir, name)) for name in manifest["els"]]
+    except (OSError, ValueError, KeyError):
+        return None
+    return manifest["zones"], dfs, els
+
+
+def _save_npy(path, array):
+    # a new inode instead of truncating in place: DataFrames returned earlier
+    # may still memory-map the old file, and would fault on a truncated one
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            np.save(f, array)
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+def _write_parsed_cache(filename, stat, zones, dfs, els):
+    cache_dir = parsed_cache_dir(filename)
+    manifest = {
+        "path": os.path.abspath(filename),
+        "size": stat.st_size,
+        "mtime_ns": stat.st_mtime_ns,
+        "zones": zones,
+        "variables": list(dfs[0].columns) if dfs else [],
+        "dfs": [f"zone{i}.npy" for i in range(len(dfs))],
+        "els": [f"elements{i}.npy" for i in range(len(els))],
+    }
+    try:
+        os.makedirs(cache_dir, exist_ok=True)
+        # the manifest goes last, so a half written cache is never used
+        manifest_path = os.path.join(cache_dir, "manifest.json")
+        if os.path.exists(manifest_path):
+            os.remove(manifest_path)
+        for name, df in zip(manifest["dfs"], dfs):
+            _save_npy(os.path.join(cache_dir, name), df.to_numpy(dtype=np.float64))
+        for name, elems in zip(manifest["els"], els):
+            _save_npy(os.path.join(cache_dir, name), elems)
+        with open(manifest_path, "w") as f:
+            json.dump(manifest, f)
+    except OSError:
+        pass
+
+
+def read_tecplot_cached(filename):
+    """read_tecplot with parsed zones kept as .npy files next to filename.
+
+    The cache is keyed on path, size and mtime of filename: it is rebuilt
+    transparently after the solver rewrites the file, otherwise the columns
+    are memory-mapped from disk without parsing the text again.
+    """
+    stat = os.stat(filename)
+    cached = _load_parsed_cache(filename, stat)
+    if cached is not None:
+        return cached
+
+    zones, dfs, els = read_tecplot_numpy(filename)
+    _write_parsed_cache(filename, stat, zones, dfs, els)
+    return zones, dfs, els
+
+
 if __name__ == "__main__":
     from tecplot_reader import read_tecplot
     import os
@@ -0,0 +1,49 @@
+import dataclasses
+import itertools
+import shutil
+import subprocess
+from typing import Optional
+
+import pytest
+
+from binary_reader import BinaryOutput, read_binary_output
+from codegen.build import SolverBuildCache
+from codegen.cache import ProblemCodeGenCache
+from codegen.template_gen import gen_template
+from models import problem
+
+
+@pytest.fixture
+def run_solver(tmp_path):
+    """Generates, builds and runs a solver, returns its ALL.BIN.
+
+    Every run gets its own directory tmp_path / name. A namelist given
+    overwrites GRID_PARAMS.NML, so the solver runs with other parameters
+    than it was generated with. Skips the test without gfortran.
+    """
+    if shutil.which("gfortran") is None:
+        pytest.skip("needs gfortran")
+    build_cache = SolverBuildCache(cache_dir=str(tmp_path / "bin"))
+    runs = itertools.count()
+
+    def run(
+        problem_sympy: problem.ProblemSympy,
+        solver_params: Optional[problem.SolverParams] = None,
+        name: Optional[str] = None,
+        namelist: Optional[problem.GridParams] = None,
+    ) -> BinaryOutput:
+        out_dir = str(tmp_path / (name or f"run_{next(runs)}"))
+        solver_params = dataclasses.replace(
+            solver_params or problem.SolverParams(log_level=problem.LogLevel.Final),
+            output_format=problem.OutputFormat.Binary,
+        )
+        solver_file = gen_template(
+            problem_sympy, ProblemCodeGenCache(cache_dir=None), out_dir, solver_params
+        )
+        if namelist is not None:
+            namelist.write_namelist(out_dir, problem_sympy.coordinate_system)
+        executable = build_cache.build(solver_file)
+        subprocess.run([executable], cwd=out_dir, check=True, capture_output=True)
+        return read_binary_output(f"{out_dir}/ALL.BIN")
+
+    return run
@@ -0,0 +1,41 @@
+import json
+import os
+
+import pytest
+
+import batch_codegen
+from models import problem
+
+
+def test_batch_generates_each_problem_in_own_dir(tmp_path):
+    spec = {
+        "equation": problem.StrsModelsFromLabs["1.1"].equation,
+        "L_boundary_conditions": ["Eq(u(0,t), 0)"],
+        "R_boundary_conditions": ["Eq(u(pi,t), 1)"],
+        "initial_condition": "Eq(u(x,0), x/pi)",
+        "coordinate_system": "Xt",
+        "grid_params": {"x_step": 0.1, "t_step": 0.01},
+    }
+    specs_dir = tmp_path / "specs"
+    specs_dir.mkdir()
+    (specs_dir / "steady_1.1.json").write_text(json.dumps(spec))
+
+    out_root = tmp_path / "out"
+    exit_code = batch_codegen.main(
+        ["--labs", "1.1", "--specs-dir", str(specs_dir), "--out", str(out_root)]
+        + ["--x-step", "0.1", "--t-step", "0.01", "--workers", "2"]
+    )
+
+    assert exit_code == 0
+    for name in ["1.1", "steady_1.1"]:
+        assert os.path.exists(out_root / name / "fortran_solver.f95")
+
+
+@pytest.mark.parametrize(
+    "option", [["--theta", "2"], ["--omega", "2"], ["--output-every", "0"]]
+)
+def test_invalid_solver_params_are_usage_errors(option, capsys):
+    with pytest.raises(SystemExit) as exit_info:
+        batch_codegen.main(["--labs", "1.1", *option])
+    assert exit_info.value.code == 2
+    assert "error:" in capsys.readouterr().err
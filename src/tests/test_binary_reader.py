@@ -0,0 +1,51 @@
+import numpy as np
+
+from binary_reader import iter_snapshots, read_binary_output, read_snapshots
+
+
+def _write_binary_output(path, time, fields):
+    names = list(fields)
+    dims = next(iter(fields.values())).shape
+    with open(path, "wb") as f:
+        f.write(b"PGCFDBIN")
+        np.array([1, len(dims), *dims, len(names)], dtype=np.int32).tofile(f)
+        np.array([time], dtype=np.float64).tofile(f)
+        f.write(b"".join(name.ljust(16).encode("ascii") for name in names))
+        for values in fields.values():
+            values.astype(np.float64).ravel(order="F").tofile(f)
+
+
+def test_read_binary_output_2d(tmp_path):
+    x, y = np.meshgrid(np.linspace(0, 1, 4), np.linspace(0, 2, 3), indexing="ij")
+    path = str(tmp_path / "ALL.BIN")
+    _write_binary_output(path, 0.5, {"X": x, "Y": y, "T": x * y})
+
+    output = read_binary_output(path)
+    assert output.time == 0.5
+    assert output.dims == (4, 3)
+    assert isinstance(output["T"].base, np.memmap)
+    np.testing.assert_array_equal(output["X"], x)
+    np.testing.assert_array_equal(output["T"], x * y)
+    assert output.to_frame()["Y"].tolist() == y.ravel(order="F").tolist()
+
+
+def test_iter_snapshots_skips_partial_frame(tmp_path):
+    x = np.linspace(0, 1, 5)
+    path = str(tmp_path / "SNAPSHOTS.BIN")
+    with open(path, "wb") as f:
+        f.write(b"PGCFDSNP")
+        np.array([1, 1, len(x), 1, 2], dtype=np.int32).tofile(f)
+        f.write(b"".join(name.ljust(16).encode("ascii") for name in ["X", "T", "Ta"]))
+        x.tofile(f)
+        for time in [0.0, 0.1, 0.2]:
+            np.concatenate([[time], x * time, x + time]).tofile(f)
+        # the solver was interrupted in the middle of a frame
+        np.array([0.3, 1.0]).tofile(f)
+
+    frames = list(iter_snapshots(path))
+    assert [frame[0] for frame in frames] == [0.0, 0.1, 0.2]
+    time, frame_x, t, ta = frames[1]
+    np.testing.assert_array_equal(frame_x, x)
+    np.testing.assert_array_equal(t, x * 0.1)
+    np.testing.assert_array_equal(ta, x + 0.1)
+    assert isinstance(read_snapshots(path).frames, np.memmap)
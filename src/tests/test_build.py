@@ -0,0 +1,52 @@
+import os
+import shutil
+
+import pytest
+
+from codegen.build import BuildConfig, CompilerProfile, SolverBuildCache
+
+PROGRAM = """PROGRAM HELLO
+  PRINT *, 'HELLO'
+END PROGRAM HELLO
+"""
+
+
+@pytest.fixture
+def source_file(tmp_path):
+    path = tmp_path / "hello.f95"
+    path.write_text(PROGRAM)
+    return str(path)
+
+
+def test_key_depends_on_source_and_flags(tmp_path, source_file):
+    cache = SolverBuildCache(cache_dir=str(tmp_path / "bin"))
+    o2 = BuildConfig(CompilerProfile.O2).flags
+    assert cache.key(source_file, o2) == cache.key(source_file, list(o2))
+    assert cache.key(source_file, o2) != cache.key(
+        source_file, BuildConfig(CompilerProfile.O2, openmp=True).flags
+    )
+    key = cache.key(source_file, o2)
+    with open(source_file, "a") as f:
+        f.write("! changed\n")
+    assert cache.key(source_file, o2) != key
+    assert cache.lookup(source_file, o2) is None
+
+
+@pytest.mark.skipif(shutil.which("gfortran") is None, reason="needs gfortran")
+def test_build_reuses_executable(tmp_path, source_file):
+    cache = SolverBuildCache(cache_dir=str(tmp_path / "bin"), max_entries=1)
+    executable = cache.build(source_file)
+    inode = os.stat(executable).st_ino
+    assert cache.build(source_file) == executable
+    assert os.stat(executable).st_ino == inode
+
+    # max_entries=1: the other profile evicts the first build
+    cache.build(source_file, BuildConfig(CompilerProfile.Debug))
+    assert not os.path.exists(executable)
+
+
+def test_missing_compiler_leaves_no_temporary_files(tmp_path, source_file):
+    cache = SolverBuildCache(cache_dir=str(tmp_path / "bin"), compiler="no-gfortran")
+    with pytest.raises(OSError):
+        cache.build(source_file)
+    assert os.listdir(tmp_path / "bin") == []
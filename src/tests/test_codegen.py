@@ -1,12 +1,18 @@
-import filecmp
+import os
 
-from PyQt5 import QtWidgets
+from PyQt5 import QtTest, QtWidgets
 
-import problem
+from codegen.cache import ProblemCodeGenCache
 from main_window import MainWindow
 
 
-def test_codegen_not_fails():
+def test_codegen_not_fails(tmp_path):
     app = QtWidgets.QApplication([])
-    window = MainWindow()
+    window = MainWindow(str(tmp_path), ProblemCodeGenCache(cache_dir=None))
     window.GenerateCode()
+    for _ in range(1200):
+        if window.ui.GenerateCodeButton.isEnabled():
+            break
+        QtTest.QTest.qWait(50)
+    assert window.ui.GenerateCodeButton.isEnabled()
+    assert os.path.exists(tmp_path / "fortran_solver.f95")
@@ -0,0 +1,83 @@
+import os
+
+from codegen.cache import ProblemCodeGenCache, problem_hash
+from models import problem
+
+
+def _lab_problem(lab: str, x_step: float = 0.1) -> problem.ProblemSympy:
+    return problem.ProblemSympy(
+        problem.StrsModelsFromLabs[lab], problem.GridParams(x_step=x_step, t_step=0.01)
+    )
+
+
+def test_problem_hash_is_canonical():
+    assert problem_hash(_lab_problem("1.1")) == problem_hash(_lab_problem("1.1"))
+    assert problem_hash(_lab_problem("1.1")) != problem_hash(_lab_problem("2.1"))
+    assert problem_hash(_lab_problem("1.1")) != problem_hash(
+        _lab_problem("1.1", x_step=0.05)
+    )
+
+
+def test_memory_and_disk_tiers(tmp_path):
+    cache = ProblemCodeGenCache(cache_dir=str(tmp_path))
+    first = cache.get(_lab_problem("1.1"))
+    assert cache.get(_lab_problem("1.1")) is first
+    assert len(os.listdir(tmp_path)) == 1
+
+    # a fresh cache emulates an app restart: only the disk tier is warm
+    restarted = ProblemCodeGenCache(cache_dir=str(tmp_path))
+    from_disk = restarted.get(_lab_problem("1.1"))
+    assert from_disk is not first
+    assert from_disk.coefficients == first.coefficients
+    assert from_disk.L1 == first.L1
+
+
+def test_memory_lru_and_disk_eviction(tmp_path):
+    cache = ProblemCodeGenCache(cache_dir=str(tmp_path), memory_size=1)
+    cache.get(_lab_problem("1.1"))
+    cache.get(_lab_problem("2.1"))
+    assert len(cache._memory) == 1
+
+    cache.disk_size_limit = 1
+    cache.get(_lab_problem("2.3"))
+    assert len(cache._disk_entries()) == 1
+
+
+def test_disk_tier_of_2d_problem(tmp_path):
+    problem_58 = problem.ProblemSympy(
+        problem.StrsModelsFromLabs["5.8"],
+        problem.GridParams(x_step=0.1, t_step=0.01, y_step=0.1),
+    )
+    first = ProblemCodeGenCache(cache_dir=str(tmp_path)).get(problem_58)
+    assert os.listdir(tmp_path) == [f"{problem_hash(problem_58)}.pickle"]
+
+    from_disk = ProblemCodeGenCache(cache_dir=str(tmp_path)).get(problem_58)
+    assert from_disk is not first
+    assert from_disk.coefficients == first.coefficients
+    assert from_disk.coefficient_exprs == first.coefficient_exprs
+
+
+def test_failed_disk_write_leaves_no_temporary_files(tmp_path):
+    cache = ProblemCodeGenCache(cache_dir=str(tmp_path))
+    cache._disk_put("unpicklable", lambda: None)
+    assert os.listdir(tmp_path) == []
+
+
+def test_entries_removed_by_another_process(tmp_path, monkeypatch):
+    # batch workers share the directory and evict each other's entries
+    cache = ProblemCodeGenCache(cache_dir=str(tmp_path), disk_size_limit=1)
+    cache.get(_lab_problem("1.1"))
+    vanished = str(tmp_path / "vanished.pickle")
+    entries = cache._disk_entries
+    monkeypatch.setattr(cache, "_disk_entries", lambda: [vanished, *entries()])
+    cache.get(_lab_problem("2.1"))
+
+    def evicted_after_load(path):
+        os.remove(path)
+        raise FileNotFoundError(path)
+
+    key = problem_hash(_lab_problem("2.1"))
+    monkeypatch.setattr(os, "utime", evicted_after_load)
+    restarted = ProblemCodeGenCache(cache_dir=str(tmp_path))
+    assert restarted._disk_get(key) is not None
+    assert restarted._disk_get(key) is None
@@ -0,0 +1,74 @@
+import sympy
+
+from models import codegen_problem, problem
+from models.coordinate_systems import CoordinateSystem
+
+
+def _lab_codegen(lab: str) -> codegen_problem.ProblemCodeGen:
+    return codegen_problem.ProblemCodeGen(
+        problem.ProblemSympy(
+            problem.StrsModelsFromLabs[lab], problem.GridParams(x_step=0.1, t_step=0.01)
+        )
+    )
+
+
+def test_cse_shares_subexpressions():
+    group = _lab_codegen("2.6").coefficients["GAMSOR_TIME"]
+    before, after = group.flops_per_cell
+    assert after < before
+    names = [name for name, _ in group.temps]
+    assert names and all(name.startswith("CSE") for name in names)
+    assert any(name in group.codes["CON"] for name in names)
+
+
+def test_coefficients_are_hoisted_by_dependence():
+    i, time = sympy.symbols("I TIME")
+    xu, t = sympy.IndexedBase("XU"), sympy.IndexedBase("T")
+    classify = codegen_problem.classify
+    assert classify(sympy.Integer(2)) == codegen_problem.Dependence.Constant
+    assert classify(xu[i + 1] - xu[i]) == codegen_problem.Dependence.Space
+    assert classify(sympy.sin(time) * xu[i]) == codegen_problem.Dependence.Time
+    assert classify(t[i] * xu[i]) == codegen_problem.Dependence.Solution
+
+    coefficients = _lab_codegen("2.3").coefficients
+    assert set(coefficients["GAMSOR_CONST"].codes) == {"GAMI", "APS", "RHO"}
+    assert set(coefficients["GAMSOR_TIME"].codes) == {"CON"}
+    assert not coefficients["GAMSOR"].codes
+
+
+def test_linear_problems_are_detected():
+    assert _lab_codegen("2.1").is_linear
+    assert _lab_codegen("2.6").is_linear
+    # u**4 in the left boundary condition
+    assert not _lab_codegen("5.8").is_linear
+
+
+def test_symmetric_positive_definite_operators_are_detected():
+    assert all(_lab_codegen(lab).is_spd for lab in problem.StrsModelsFromLabs)
+    is_spd = codegen_problem.is_spd_operator
+    # convection
+    assert not is_spd(
+        sympy.parse_expr(
+            "Eq(Derivative(u(x,t), t), Derivative(u(x,t), x, x) + Derivative(u(x,t), x))"
+        )
+    )
+    # Sp of unknown sign is kept implicit
+    assert not is_spd(
+        sympy.parse_expr(
+            "Eq(Derivative(u(x,t), t), Derivative(u(x,t), x, x) + sin(x)*u(x,t))"
+        )
+    )
+
+
+def test_grid_params_namelist(tmp_path):
+    grid_params = problem.GridParams(x_step=0.1, t_step=1e-5, y_step=0.2, alltime=2.0)
+    path = grid_params.write_namelist(str(tmp_path), CoordinateSystem.Xt)
+    # the 1D solver does not declare Y_STEP and would stop reading it
+    with open(path) as f:
+        assert f.read() == (
+            "&GRID_PARAMS\n  X_STEP = 0.1,\n  T_STEP = 1e-05,\n  ALLTIME = 2.0,\n/\n"
+        )
+    assert grid_params.namelist(CoordinateSystem.XYt) == (
+        "&GRID_PARAMS\n  X_STEP = 0.1,\n  T_STEP = 1e-05,\n  Y_STEP = 0.2,\n"
+        "  ALLTIME = 2.0,\n/\n"
+    )
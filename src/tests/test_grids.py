@@ -0,0 +1,84 @@
+import numpy as np
+import pytest
+
+from models import problem
+from models.coordinate_systems import CoordinateSystem
+
+# boundary layer of width 0.05 at x = 0
+BOUNDARY_LAYER = problem.ProblemStrs(
+    equation="Eq(Derivative(u(x), x, x), 400*u(x) - 400)",
+    L_boundary_conditions=["Eq(u(0), 0)"],
+    R_boundary_conditions=["Eq(u(1), 1 - exp(-20))"],
+    analytical_solution="1 - exp(-20*x)",
+    coordinate_system=CoordinateSystem.X,
+)
+
+
+def test_stretched_grid_namelist(tmp_path):
+    grid_params = problem.GridParams(
+        x_step=0.1,
+        t_step=0.01,
+        x_grid={"kind": "Tanh", "cluster": "Left", "stretch": 2},
+        y_grid=problem.StretchedGrid(problem.GridKind.Nodes, nodes=[0, 0.25, 1]),
+    )
+    path = grid_params.write_namelist(str(tmp_path), CoordinateSystem.XYt)
+    with open(path) as f:
+        assert f.read() == (
+            "&GRID_PARAMS\n  X_STEP = 0.1,\n  T_STEP = 0.01,\n"
+            "  X_GRID = 'Tanh',\n  X_CLUSTER = 'Left',\n  X_STRETCH = 2.0,\n"
+            "  Y_GRID = 'Nodes',\n/\n"
+        )
+    assert np.loadtxt(tmp_path / "Y_NODES.DAT").tolist() == [0, 0.25, 1]
+
+    # 1D solvers read only the X entries
+    (tmp_path / "1d").mkdir()
+    path = grid_params.write_namelist(str(tmp_path / "1d"), CoordinateSystem.Xt)
+    with open(path) as f:
+        assert "Y_" not in f.read()
+    assert not (tmp_path / "1d" / "Y_NODES.DAT").exists()
+    with pytest.raises(ValueError):
+        problem.ProblemSympy(BOUNDARY_LAYER, grid_params)
+
+    with pytest.raises(ValueError):
+        problem.StretchedGrid(problem.GridKind.Geometric)
+    with pytest.raises(ValueError):
+        problem.StretchedGrid(problem.GridKind.Nodes, nodes=[0, 1, 0.5])
+
+
+def test_clustered_grid_resolves_boundary_layer(run_solver):
+    def solve(grid_params):
+        return run_solver(problem.ProblemSympy(BOUNDARY_LAYER, grid_params))
+
+    def max_error(output):
+        return np.max(np.abs(output["T"] - output["Ta"]))
+
+    fine = solve(problem.GridParams(x_step=0.005, t_step=1.0))
+    clustered = solve(
+        problem.GridParams(
+            x_step=0.05,
+            t_step=1.0,
+            x_grid=problem.StretchedGrid(
+                problem.GridKind.Tanh, problem.Cluster.Left, stretch=2.5
+            ),
+        ),
+    )
+    # 18 clustered cells beat 198 uniform ones
+    assert max_error(clustered) < max_error(fine)
+
+    nodes = [0, 0.01, 0.03, 0.07, 0.15, 0.3, 0.6, 1]
+    listed = solve(
+        problem.GridParams(
+            x_step=0.05,
+            t_step=1.0,
+            x_grid=problem.StretchedGrid(problem.GridKind.Nodes, nodes=nodes),
+        ),
+    )
+    centers = [(a + b) / 2 for a, b in zip(nodes, nodes[1:])]
+    assert listed["X"] == pytest.approx([0, *centers, 1])
+
+
+def test_1d_solver_runs_with_y_step(run_solver):
+    # batch_codegen --y-step applies to 1D labs as well
+    grid_params = problem.GridParams(x_step=0.005, t_step=1.0, y_step=0.05)
+    output = run_solver(problem.ProblemSympy(BOUNDARY_LAYER, grid_params))
+    assert np.max(np.abs(output["T"] - output["Ta"])) < 2e-3
@@ -0,0 +1,112 @@
+import logging
+
+import numpy as np
+import pytest
+
+from codegen import numpy_backend
+from codegen.cache import ProblemCodeGenCache
+from models import problem
+from models.coordinate_systems import CoordinateSystem
+
+
+def test_tdma_solves_a_batch():
+    rng = np.random.default_rng(0)
+    aim, aip = rng.random((2, 4, 3, 20))
+    ap = aim + aip + rng.random((4, 3, 20))
+    b = rng.random((4, 3, 20))
+    t = numpy_backend.tdma(aim, ap, aip, b)
+
+    matrix = (
+        np.apply_along_axis(np.diag, -1, ap)
+        - np.apply_along_axis(np.diag, -1, aim[..., 1:], -1)
+        - np.apply_along_axis(np.diag, -1, aip[..., :-1], 1)
+    )
+    assert t == pytest.approx(np.linalg.solve(matrix, b[..., None])[..., 0])
+
+
+@pytest.mark.parametrize("lab,theta", [("2.1", 1.0), ("2.6", 0.5)])
+def test_numpy_backend_matches_fortran(run_solver, lab, theta):
+    problem_sympy = problem.ProblemSympy(
+        problem.StrsModelsFromLabs[lab],
+        problem.GridParams(x_step=0.02, t_step=0.01, alltime=0.5),
+    )
+    solver_params = problem.SolverParams(log_level=problem.LogLevel.Final, theta=theta)
+    fortran = run_solver(problem_sympy, solver_params)
+
+    output = numpy_backend.solve(
+        problem_sympy, solver_params, cache=ProblemCodeGenCache(cache_dir=None)
+    )
+    assert output.time == pytest.approx(fortran.time)
+    for name in ["X", "T", "Ta"]:
+        assert output[name] == pytest.approx(fortran[name], abs=1e-12)
+
+
+def test_parameters_are_solved_as_a_batch():
+    problem_sympy = problem.ProblemSympy(
+        problem.ProblemStrs(
+            equation="Eq(Derivative(u(x,t), t), k*Derivative(u(x,t), x, x))",
+            L_boundary_conditions=["Eq(u(0,t), 0)"],
+            R_boundary_conditions=["Eq(u(pi,t), 0)"],
+            initial_condition="Eq(u(x,0), sin(3*x))",
+            analytical_solution="exp(-9*k*t)*sin(3*x)",
+            coordinate_system=CoordinateSystem.Xt,
+        ),
+        problem.GridParams(x_step=0.02, t_step=0.002, alltime=0.1),
+    )
+    cache = ProblemCodeGenCache(cache_dir=None)
+    crank_nicolson = problem.SolverParams(theta=0.5)
+    k = np.array([0.5, 1.0, 2.0])
+    batch = numpy_backend.solve(problem_sympy, crank_nicolson, {"k": k}, cache)
+    assert batch["T"].shape == (3, len(batch["X"]))
+    assert np.all(batch["delT"] < 1e-3)
+
+    single = numpy_backend.solve(problem_sympy, crank_nicolson, {"k": k[1]}, cache)
+    assert single["T"] == pytest.approx(batch["T"][1], abs=1e-14)
+
+    with pytest.raises(ValueError):
+        numpy_backend.solve(problem_sympy, cache=cache)
+
+
+def test_stationary_problem():
+    problem_sympy = problem.ProblemSympy(
+        problem.ProblemStrs(
+            equation="Eq(Derivative(u(x), x, x) + u(x), 0)",
+            L_boundary_conditions=["Eq(u(0), 1)"],
+            R_boundary_conditions=["Eq(Derivative(u(1), x), cos(1) - sin(1))"],
+            analytical_solution="cos(x) + sin(x)",
+            coordinate_system=CoordinateSystem.X,
+        ),
+        problem.GridParams(x_step=0.005, t_step=1.0),
+    )
+    output = numpy_backend.solve(
+        problem_sympy, cache=ProblemCodeGenCache(cache_dir=None)
+    )
+    assert output.time == 0
+    assert np.max(output["delT"]) < 1e-3
+
+
+def test_iterations_stop_per_system(monkeypatch, caplog):
+    # DT = 1 makes Sp = 1 lagged, so every step iterates until RMAX < eps
+    problem_sympy = problem.ProblemSympy(
+        problem.ProblemStrs(
+            equation="Eq(Derivative(u(x,t), t),"
+            " Derivative(u(x,t), x, x) + u(x,t) + k)",
+            L_boundary_conditions=["Eq(u(0,t), 0)"],
+            R_boundary_conditions=["Eq(u(pi,t), 0)"],
+            initial_condition="Eq(u(x,0), sin(x))",
+            coordinate_system=CoordinateSystem.Xt,
+        ),
+        problem.GridParams(x_step=0.05, t_step=1.0, alltime=3.0),
+    )
+    cache = ProblemCodeGenCache(cache_dir=None)
+    k = np.array([0.0, 0.1, 10.0])
+    batch = numpy_backend.solve(problem_sympy, params={"k": k}, cache=cache)
+    # a converged system is not iterated further for the others
+    for i, value in enumerate(k):
+        single = numpy_backend.solve(problem_sympy, params={"k": value}, cache=cache)
+        assert np.array_equal(single["T"], batch["T"][i])
+
+    monkeypatch.setattr(numpy_backend, "MAX_ITERATIONS", 1)
+    with caplog.at_level(logging.WARNING, logger=numpy_backend.__name__):
+        numpy_backend.solve(problem_sympy, params={"k": k}, cache=cache)
+    assert "RMAX is above eps after 1 iterations" in caplog.text
@@ -0,0 +1,22 @@
+from solver_runner import parse_solver_line
+
+
+def test_parse_solver_line():
+    assert parse_solver_line(
+        "    1.000000E-01    4.718160E-01    4.718171E-01    1.1E-06    2.3E-04"
+    ) == {
+        "TIME": 0.1,
+        "T": 4.718160e-01,
+        "Ta": 4.718171e-01,
+        "delT": 1.1e-06,
+        "delT1": 2.3e-04,
+    }
+    assert parse_solver_line("   2.4492935982947064E-016") == {
+        "RMAX": 2.4492935982947064e-16
+    }
+    assert parse_solver_line("    1.000000E-01    4.718160E-01    4.718171E-01") == {
+        "TIME": 0.1,
+        "T": 4.718160e-01,
+        "Ta": 4.718171e-01,
+    }
+    assert parse_solver_line("     TIME            T(5)            TAN(5)") is None
@@ -0,0 +1,104 @@
+import numpy as np
+import pandas as pd
+
+import tecplot_reader
+from tecplot_reader import (
+    load_zone_index,
+    read_tecplot,
+    read_tecplot_cached,
+    read_zone,
+    read_zones,
+)
+
+STRUCTURED = """ VARIABLES="X","T","Ta","delT",          "delT1"
+ ZONE T="first", I=3, F=POINT
+   0.000000E+00   0.000000E+00   0.000000E+00   0.000000E+00            NaN
+   5.018519E-03   1.597444E-03   1.597444E-03   5.624841E-16   3.521150E-11
+   1.505556E-02   4.792332E-03   4.792332E-03   1.687886E-15   ***********
+ ZONE T="second", I=2, F=POINT
+   1.0 2.0 3.0 4.0 5.0
+   6.0 7.0 8.0 9.0 10.0
+"""
+
+FINITE_ELEMENT = """TITLE = "fe"
+VARIABLES = "X", "Y"
+ZONE T="mesh"
+Nodes=4, Elements=2
+DATAPACKING=POINT
+DT=(SINGLE SINGLE)
+0.0 0.0
+1.0 0.0
+1.0 1.0
+0.0 1.0
+1 2 3
+1 3 4
+"""
+
+
+def _read_both(tmp_path, text):
+    path = tmp_path / "ALL.DAT"
+    path.write_text(text)
+    return (
+        read_tecplot(str(path), verbose=False),
+        read_tecplot(str(path), verbose=False, engine="numpy"),
+    )
+
+
+def test_numpy_engine_matches_python_engine(tmp_path):
+    (zones, dfs, els), (np_zones, np_dfs, np_els) = _read_both(tmp_path, STRUCTURED)
+    assert np_zones == zones
+    assert len(np_dfs) == len(dfs) == 2
+    for df, np_df in zip(dfs, np_dfs):
+        pd.testing.assert_frame_equal(np_df, df)
+    assert np_els == els == []
+
+
+def test_numpy_engine_finite_element_zone(tmp_path):
+    (zones, dfs, els), (np_zones, np_dfs, np_els) = _read_both(tmp_path, FINITE_ELEMENT)
+    assert np_zones == zones
+    pd.testing.assert_frame_equal(np_dfs[0], dfs[0])
+    np.testing.assert_array_equal(np_els[0], np.array(els[0], dtype=np.int64))
+
+
+def test_zone_index_random_access(tmp_path):
+    path = tmp_path / "ALL.DAT"
+    path.write_text(STRUCTURED)
+    zones, dfs, _ = read_tecplot(str(path), verbose=False)
+
+    pd.testing.assert_frame_equal(read_zone(str(path), 1), dfs[1])
+    pd.testing.assert_frame_equal(read_zone(str(path), "first"), dfs[0])
+    assert (tmp_path / "ALL.DAT.zidx").exists()
+
+    sliced_zones, sliced_dfs, _ = read_zones(str(path), slice(1, None))
+    assert sliced_zones == zones[1:]
+    pd.testing.assert_frame_equal(sliced_dfs[0], dfs[1])
+
+
+def test_zone_index_rebuilt_after_rewrite(tmp_path):
+    path = tmp_path / "ALL.DAT"
+    path.write_text(STRUCTURED)
+    assert len(load_zone_index(str(path)).zones) == 2
+
+    path.write_text(STRUCTURED + ' ZONE T="third"\n 1 2 3 4 5\n')
+    assert len(load_zone_index(str(path)).zones) == 3
+    assert read_zone(str(path), "third")["delT1"].tolist() == [5.0]
+
+
+def test_parsed_cache_invalidated_on_rewrite(tmp_path, monkeypatch):
+    path = tmp_path / "ALL.DAT"
+    path.write_text(STRUCTURED)
+    zones, dfs, _ = read_tecplot(str(path), verbose=False)
+    read_tecplot_cached(str(path))
+    assert (tmp_path / "ALL.DAT.npcache" / "manifest.json").exists()
+
+    with monkeypatch.context() as patch:
+        patch.setattr(tecplot_reader, "read_tecplot_numpy", None)
+        cached_zones, cached_dfs, _ = read_tecplot_cached(str(path))
+    assert cached_zones == zones
+    pd.testing.assert_frame_equal(cached_dfs[1], dfs[1])
+
+    path.write_text(STRUCTURED.replace("1.0 2.0", "-1.0 2.0"))
+    assert read_tecplot_cached(str(path))[1][1]["X"].tolist() == [-1.0, 6.0]
+    # the rebuilt cache does not touch files still mapped by earlier results
+    pd.testing.assert_frame_equal(cached_dfs[1], dfs[1])
+    assert not list((tmp_path / "ALL.DAT.npcache").glob("*.tmp"))
@@ -0,0 +1,95 @@
+import numpy as np
+import pytest
+
+from codegen import numpy_backend
+from codegen.cache import ProblemCodeGenCache
+from models import problem
+from models.coordinate_systems import CoordinateSystem
+
+STATIONARY = {
+    # linear, one TDMA solve
+    "sin": problem.ProblemStrs(
+        equation="Eq(Derivative(u(x), x, x), -sin(x))",
+        L_boundary_conditions=["Eq(u(0), 0)"],
+        R_boundary_conditions=["Eq(u(pi), 0)"],
+        analytical_solution="sin(x)",
+        coordinate_system=CoordinateSystem.X,
+    ),
+    # positive Sp is lagged, iterated until eps
+    "cos": problem.ProblemStrs(
+        equation="Eq(Derivative(u(x), x, x) + u(x), 0)",
+        L_boundary_conditions=["Eq(u(0), 1)"],
+        R_boundary_conditions=["Eq(Derivative(u(1), x), cos(1) - sin(1))"],
+        analytical_solution="cos(x) + sin(x)",
+        coordinate_system=CoordinateSystem.X,
+    ),
+}
+
+
+def _problem(lab: str, t_step: float, alltime: float = 0.2) -> problem.ProblemSympy:
+    return problem.ProblemSympy(
+        STATIONARY.get(lab) or problem.StrsModelsFromLabs[lab],
+        problem.GridParams(x_step=0.005, t_step=t_step, alltime=alltime),
+    )
+
+
+def _params(**solver_params) -> problem.SolverParams:
+    return problem.SolverParams(log_level=problem.LogLevel.Final, **solver_params)
+
+
+def _max_error(run_solver, lab: str, t_step: float, theta: float) -> float:
+    output = run_solver(_problem(lab, t_step), _params(theta=theta))
+    assert output.time == pytest.approx(0.2)
+    return float(np.max(output["delT"]))
+
+
+def test_crank_nicolson_needs_fewer_steps(run_solver):
+    implicit = _max_error(run_solver, "1.1", 0.002, 1.0)
+    crank_nicolson = _max_error(run_solver, "1.1", 0.02, 0.5)
+    # 10 steps of the second order scheme against 100 implicit steps
+    assert crank_nicolson < implicit / 2
+    # halving the step quarters the error
+    assert _max_error(run_solver, "1.1", 0.01, 0.5) < crank_nicolson / 3
+
+
+def test_adaptive_step_grows_after_transient(tmp_path, run_solver):
+    run_solver(
+        _problem("1.1", 0.002, 1.0),
+        _params(adaptive_dt=True, dt_tol=1e-4),
+        name="adaptive",
+    )
+    step, time, dt, err = np.loadtxt(
+        tmp_path / "adaptive" / "DT.OUT", skiprows=1, unpack=True
+    )
+    assert time[-1] == pytest.approx(1.0)
+    assert np.all(err <= 1e-4)
+    # the step grows as E**(-9*t) decays: far fewer steps than 1.0/0.002
+    assert dt[-2] > 10 * dt[0]
+    assert len(step) < 250
+
+
+@pytest.mark.parametrize("name", list(STATIONARY))
+def test_stationary_problem_is_solved_directly(run_solver, name):
+    output = run_solver(_problem(name, 1.0), _params())
+    assert output.time == 0
+    assert np.max(output["delT"]) < 1e-3
+
+
+def test_run_stops_at_steady_state(run_solver):
+    output = run_solver(_problem("1.1", 0.01, 5.0), _params(steady_tol=1e-3))
+    # 4*9*E**(-9*t) < 1e-3 from t = 1.17
+    assert 1.0 < output.time < 1.5
+    assert np.max(np.abs(output["T"] - output["Ta"])) < 1e-3
+
+
+def test_positive_sp_is_lagged_at_runtime_step(run_solver):
+    # generated for T_STEP = 0.01, where the transient term outweighs Sp = 1
+    grid_params = problem.GridParams(x_step=0.005, t_step=1.0, alltime=5.0)
+    output = run_solver(_problem("2.6", 0.01), _params(), namelist=grid_params)
+
+    lagged = numpy_backend.solve(
+        problem.ProblemSympy(problem.StrsModelsFromLabs["2.6"], grid_params),
+        cache=ProblemCodeGenCache(cache_dir=None),
+    )
+    assert output.time == pytest.approx(5.0)
+    assert output["T"] == pytest.approx(lagged["T"], abs=1e-12)